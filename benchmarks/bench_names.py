@@ -0,0 +1,103 @@
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logic import names
+
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+
+# Micro-benchmark del percorso caldo di normalizzazione dei nomi: la stessa
+# sequenza di chiamate (fix_mojibake, normalize_fullname_for_keys, canonical_key
+# sul nome e sul cognome) su qualche centinaio di nomi ripetuti, con le funzioni
+# originali non memoizzate (__wrapped__) e con il servizio memoizzato di logic/names.py.
+#
+#   python benchmarks/bench_names.py
+
+DRIVERS = [
+    "Max Verstappen", "Lando Norris", "Charles Leclerc", "Oscar Piastri", "George Russell",
+    "Lewis Hamilton", "Kimi Antonelli", "Fernando Alonso", "Pierre Gasly", "Nico Hülkenberg",
+    "Marc Márquez", "Francesco Bagnaia", "Álex Márquez", "Jorge Martín", "Fermín Aldeguer",
+    "Maverick Viñales", "Raúl Fernández", "Fabio Di Giannantonio", "Pedro Acosta", "Johann Zarco",
+]
+NAMES_PER_RENDER = 300
+CALLS = 200_000
+
+# -------------------------------------------------------------------------------------------
+
+def name_pool(n, seed=0):
+    """Varianti realistiche: "Cognome, Nome", spazi extra, mojibake, maiuscole."""
+    rng = random.Random(seed)
+    pool = []
+    for i in range(n):
+        name = DRIVERS[i % len(DRIVERS)]
+        variant = rng.randrange(4)
+        if variant == 1:
+            first, _, last = name.partition(" ")
+            name = f"{last}, {first}"
+        elif variant == 2:
+            name = name.encode("utf-8").decode("latin-1")
+        elif variant == 3:
+            name = "  " + name.upper().replace(" ", "   ") + " "
+        pool.append(name)
+    return pool
+
+# -------------------------------------------------------------------------------------------
+
+def hot_path(impl, raw_names, calls):
+    """Le chiamate fatte per ogni pilota da format_name / build_points_dict / show_racer_screen."""
+    fix, full, canon = impl
+    n = len(raw_names)
+    for i in range(calls):
+        raw = raw_names[i % n]
+        fixed = fix(raw)
+        parsed = full(fixed)
+        surname = parsed.split()[-1] if parsed else parsed
+        canon(parsed)
+        canon(surname)
+        canon(raw)
+
+# -------------------------------------------------------------------------------------------
+
+def uncached_canonical(name):
+    name = names._normalize_fullname_for_keys.__wrapped__(names._fix_mojibake.__wrapped__(str(name)))
+    key = names._normalize_name.__wrapped__(name)
+    return names.MANUAL_CORRECTIONS.get(key, key)
+
+# -------------------------------------------------------------------------------------------
+
+def main():
+    raw_names = name_pool(NAMES_PER_RENDER)
+
+    uncached = (
+        names._fix_mojibake.__wrapped__,
+        names._normalize_fullname_for_keys.__wrapped__,
+        uncached_canonical,
+    )
+    memoized = (names.fix_mojibake, names.normalize_fullname_for_keys, names.canonical_key)
+
+    for raw in raw_names:
+        assert uncached[2](raw) == memoized[2](raw)
+
+    names.clear_name_caches()
+    results = {}
+    for label, impl in (("uncached", uncached), ("memoized", memoized)):
+        start = time.perf_counter()
+        hot_path(impl, raw_names, CALLS)
+        results[label] = time.perf_counter() - start
+
+    per_call = {k: v / CALLS * 1e6 for k, v in results.items()}
+    print(f"{CALLS} names ({len(set(raw_names))} distinct raw spellings)")
+    print(f"uncached  {results['uncached'] * 1000:9.1f} ms  {per_call['uncached']:6.2f} us/name")
+    print(f"memoized  {results['memoized'] * 1000:9.1f} ms  {per_call['memoized']:6.2f} us/name")
+    print(f"speedup   {results['uncached'] / results['memoized']:9.1f}x")
+    print(f"canonical_key cache: {names._canonical_key.cache_info()}")
+
+# -------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from computation import pages
+from computation.pages import (
+    parse_results, _parse_results_bs4, classification_tables, read_classifications, cache_path,
+)
+
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+
+# Benchmark del parsing delle pagine dei risultati, offline, su snapshot HTML
+# salvati (le fixture di computation/pages.py: una cartella per serie, per
+# esempio la cache di un extractor lanciato su tutta la stagione):
+#
+#   python benchmarks/bench_parse.py --f1 fixtures/f1 --mgp fixtures/mgp
+#
+# Senza cartelle genera una stagione sintetica (ROUNDS gare: 5 pagine F1 e una
+# pagina MotoGP con molte tabelle per gara) con la stessa struttura delle pagine
+# reali, utile per confrontare i parser ma non per i tempi assoluti. Le gare
+# dispari usano la struttura di Wikipedia / formula1.com: intestazioni su due
+# righe con rowspan, posizioni in <th scope="row">, piè di pagina "Fastest lap"
+# e "Source" come <th colspan>, tabelle annidate nelle celle.
+#   python benchmarks/bench_parse.py --synthetic
+#
+# Ogni parser in streaming (lxml.iterparse) viene prima confrontato riga per
+# riga con il percorso di riferimento (BeautifulSoup / pd.read_html) su tutte
+# le pagine.
+
+ROUNDS = 24
+REPEAT = 3
+
+# -------------------------------------------------------------------------------------------
+
+def parse_mgp_pandas(html):
+    """Vecchio percorso di extractor_mgp: tutte le tabelle con pd.read_html, poi le prime due classifiche."""
+    return [table.values.tolist() for table in classification_tables(pd.read_html(StringIO(html)))[:2]]
+
+def parse_mgp_stream(html):
+    return read_classifications(html, limit=2)
+
+# il primo parser di ogni serie è il riferimento per il controllo di parità
+PARSERS = {
+    "f1": {"bs4 html.parser": _parse_results_bs4},
+    "mgp": {"pandas read_html": parse_mgp_pandas},
+}
+if pages.etree is not None:
+    PARSERS["f1"]["lxml streaming"] = parse_results
+    PARSERS["mgp"]["lxml streaming"] = parse_mgp_stream
+
+# -------------------------------------------------------------------------------------------
+
+RIDERS = [
+    "Marc Márquez", "Álex Márquez", "Francesco Bagnaia", "Marco Bezzecchi", "Pedro Acosta",
+    "Fabio Di Giannantonio", "Fermín Aldeguer", "Franco Morbidelli", "Johann Zarco", "Fabio Quartararo",
+    "Jorge Martín", "Enea Bastianini", "Maverick Viñales", "Raúl Fernández", "Joan Mir",
+    "Luca Marini", "Brad Binder", "Jack Miller", "Ai Ogura", "Miguel Oliveira",
+]
+
+def _boilerplate(rng, links):
+    nav = "".join(f'<li class="nav-item"><a href="/p/{rng.randrange(10**6)}">Link {i}</a></li>' for i in range(links))
+    return f'<header><nav><ul>{nav}</ul></nav></header><script>var cfg = {{"x": {rng.random()}}};</script>'
+
+def _table(header, rows, extra=""):
+    head = "".join(f"<th>{h}</th>" for h in header)
+    body = "".join("<tr>" + "".join(f"<td>{c}</td>" for c in row) + "</tr>" for row in rows)
+    return f'<table class="wikitable"><tbody><tr>{head}</tr>{body}{extra}</tbody></table>'
+
+def _wiki_table(rows, footer, width=9):
+    """Classifica come la rende Wikipedia: intestazione su due righe, posizione in <th>, piè di pagina in <th colspan>."""
+    head = ('<tr><th rowspan="2">Pos.</th><th rowspan="2">No.</th><th rowspan="2">Rider</th>'
+            '<th colspan="2">Team</th><th rowspan="2">Laps</th><th rowspan="2">Time/Retired</th>'
+            '<th rowspan="2">Grid</th><th rowspan="2">Points</th></tr><tr><th>Name</th><th>Manufacturer</th></tr>')
+    body = "".join(
+        f'<tr><th scope="row">{row[0]}</th>'
+        f'<td>{row[1]}</td><td><span class="flagicon"><span style="display:none">ESP</span></span> {row[2]}</td>'
+        + "".join(f"<td>{c}</td>" for c in row[3:]) + "</tr>"
+        for row in rows
+    )
+    foot = "".join(f'<tr><th colspan="{width}">{text}</th></tr>' for text in footer)
+    return f'<table class="wikitable"><tbody>{head}{body}{foot}</tbody></table>'
+
+def _lap_time(rng):
+    return f"1:{rng.randrange(20, 40)}.{rng.randrange(1000):03d}"
+
+def synthetic_f1_page(rng, real=False):
+    rows = [
+        [pos, rng.randrange(1, 99), f"{name} {name[:3].upper()}", "Team", 57, _lap_time(rng), 25]
+        for pos, name in enumerate(rng.sample(RIDERS, 20), start=1)
+    ]
+    rows[-1][0] = "NC"
+    if real:
+        # logo della scuderia in una tabella annidata nella cella: chiude prima della classifica
+        rows[0][3] = '<table class="logo"><tbody><tr><td>Team</td><td>1</td></tr></tbody></table>'
+    table = _table(["Pos.", "No.", "Driver", "Team", "Laps", "Time / Retired", "Pts."], rows)
+    return f"<html><body>{_boilerplate(rng, 1500)}<main>{table}</main></body></html>"
+
+def synthetic_mgp_page(rng, real=False):
+    tables = [_table(["Info", "Value"], [[f"k{i}", f"v{i}"] for i in range(8)]) for _ in range(20)]
+    if real:
+        # infobox con una tabella annidata, prima delle classifiche
+        nested = _table(["Lap", "Time"], [[1, _lap_time(rng)]])
+        tables[0] = _table(["Info", "Value"], [["Fastest lap", nested], ["Distance", "120 km"]])
+    for _ in range(2):
+        tables.append(_table(["Pos.", "No.", "Rider", "Team", "Q1", "Q2", "Grid"],
+                             [[p, rng.randrange(99), n, "Team", _lap_time(rng), _lap_time(rng), p]
+                              for p, n in enumerate(rng.sample(RIDERS, 20), start=1)]))
+    for session in ("sprint", "race", "moto2", "moto3"):
+        rows = [[p, rng.randrange(99), n, "Team", "Ducati", 27, _lap_time(rng), p, 25]
+                for p, n in enumerate(rng.sample(RIDERS, 20), start=1)]
+        fastest = (f'Fastest lap: {rng.choice(RIDERS)} (Ducati) – '
+                   f'{_lap_time(rng)} (lap {rng.randrange(1, 27)})')
+        if real:
+            rows[-1][0] = "Ret"
+            tables.append(_wiki_table(rows, [fastest, "Source:<sup>[1]</sup>"]))
+        else:
+            tables.append(_table(["Pos.", "No.", "Rider", "Team", "Manufacturer", "Laps", "Time/Retired", "Grid", "Points"],
+                                 rows, f'<tr><td colspan="9">{fastest}</td></tr><tr><td colspan="9">Source:</td></tr>'))
+        tables.append(_table(["Note"], [["ref"]]))
+    return f"<html><body>{_boilerplate(rng, 800)}<div id='content'>{''.join(tables)}</div></body></html>"
+
+def write_synthetic_season(root, rounds=ROUNDS, seed=0):
+    rng = random.Random(seed)
+    dirs = {"f1": os.path.join(root, "f1"), "mgp": os.path.join(root, "mgp")}
+    for path in dirs.values():
+        os.makedirs(path, exist_ok=True)
+    for rnd in range(rounds):
+        for page in ("race-result", "qualifying", "fastest-laps", "sprint-results", "sprint-qualifying"):
+            url = f"https://www.formula1.com/en/results/2025/races/{rnd}/{page}"
+            with open(cache_path(url, dirs["f1"]), "w", encoding="utf-8") as f:
+                f.write(synthetic_f1_page(rng, real=rnd % 2 == 1))
+        url = f"https://en.wikipedia.org/wiki/2025_Round_{rnd}_motorcycle_Grand_Prix"
+        with open(cache_path(url, dirs["mgp"]), "w", encoding="utf-8") as f:
+            f.write(synthetic_mgp_page(rng, real=rnd % 2 == 1))
+    return dirs
+
+# -------------------------------------------------------------------------------------------
+
+def load_pages(folder):
+    pages = []
+    for name in sorted(os.listdir(folder)):
+        if name.endswith(".html"):
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                pages.append((name, f.read()))
+    return pages
+
+def bench(parser, pages, repeat):
+    """Tempo migliore (s) sull'intero set di pagine; le pagine su cui il parser fallisce sono contate a parte."""
+    best = float("inf")
+    failed = 0
+    for _ in range(repeat):
+        failed = 0
+        start = time.perf_counter()
+        for _, html in pages:
+            try:
+                parser(html)
+            except Exception:
+                failed += 1
+        best = min(best, time.perf_counter() - start)
+    return best, failed
+
+def _normalized(value):
+    """nan di pandas e None sono la stessa cella vuota."""
+    if isinstance(value, list):
+        return [_normalized(v) for v in value]
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+def check_parity(reference, parser, pages):
+    """Nomi delle pagine su cui parser e riferimento non danno le stesse righe."""
+    mismatched = []
+    for name, html in pages:
+        try:
+            same = _normalized(reference(html)) == _normalized(parser(html))
+        except Exception:
+            same = False
+        if not same:
+            mismatched.append(name)
+    return mismatched
+
+# -------------------------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--f1", help="cartella di snapshot delle pagine F1")
+    ap.add_argument("--mgp", help="cartella di snapshot delle pagine MotoGP")
+    ap.add_argument("--synthetic", action="store_true", help="genera una stagione sintetica")
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    args = ap.parse_args()
+
+    dirs = {"f1": args.f1, "mgp": args.mgp}
+    tmp = None
+    if args.synthetic or not any(dirs.values()):
+        tmp = tempfile.TemporaryDirectory()
+        dirs = write_synthetic_season(tmp.name)
+
+    print(f"{'series':<6} {'parser':<22} {'pages':>6} {'MB':>6} {'total ms':>10} {'ms/page':>9} {'failed':>7}")
+    for series, folder in dirs.items():
+        if not folder:
+            continue
+        pages = load_pages(folder)
+        size = sum(len(html) for _, html in pages) / 1e6
+        reference = next(iter(PARSERS[series].values()))
+        baseline = None
+        for label, parser in PARSERS[series].items():
+            if parser is not reference:
+                mismatched = check_parity(reference, parser, pages)
+                if mismatched:
+                    print(f"{series:<6} {label:<22} righe diverse dal riferimento su {len(mismatched)} pagine, "
+                          f"per esempio {mismatched[0]}")
+            total, failed = bench(parser, pages, args.repeat)
+            per_page = total / max(1, len(pages)) * 1000
+            speedup = "" if baseline is None else f" {baseline / total:6.1f}x"
+            baseline = total if baseline is None else baseline
+            print(f"{series:<6} {label:<22} {len(pages):>6} {size:>6.1f} {total * 1000:>10.1f} {per_page:>9.2f} {failed:>7}{speedup}")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+# -------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from logic.standings import build_standings_tables, STANDINGS_OUTPUT_COLUMNS
+
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+
+# Benchmark della costruzione delle classifiche: join a chiave
+# (build_standings_tables) contro i cicli annidati della vecchia standings_screen,
+# su league sintetiche da 10, 100 e 1000 team.
+#
+#   python benchmarks/bench_standings.py
+
+SIZES = (10, 100, 1000)
+# il riempimento dei nomi del vecchio codice è cubico: oltre questa soglia
+# la versione legacy non viene eseguita
+LEGACY_MAX_TEAMS = 200
+LEAGUE = "bench"
+PENALTY_F1 = -3.0
+PENALTY_MGP = -2.0
+
+# -------------------------------------------------------------------------------------------
+
+def synthetic_league(n_teams, seed=0):
+    rng = random.Random(seed)
+    teams, standings, penalties = [], {}, []
+    # una league "rumore" per verificare i filtri
+    for league in (LEAGUE, "other"):
+        for i in range(n_teams):
+            team_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            teams.append({"UUID": team_id, "league": league, "name": f"{league} team {i}"})
+            penalties.append({"uuid": team_id, "league": league, "penalty_f1": rng.randint(0, 3), "penalty_mgp": rng.randint(0, 3)})
+            if league == LEAGUE:
+                standings[team_id] = {"f1": rng.uniform(0, 900), "mgp": rng.uniform(0, 900)}
+    return teams, standings, penalties
+
+# -------------------------------------------------------------------------------------------
+
+def legacy_standings_tables(teams, league, league_standings, penalties, penalty_points_f1, penalty_points_mgp):
+    """Vecchio assemblaggio di standings_screen: cicli teams × team_points e pen_list × team_points."""
+    team_points = {}
+    penalty_points_dict = {}
+    for team in teams:
+        if team["league"] == league:
+            team_name = team.get("UUID")
+            if not team_name:
+                continue
+            team_points[team_name] = {"F1": {}, "MotoGP": {}, "Name": {}}
+            penalty_points_dict[team_name] = {"F1": 0, "MotoGP": 0, "Name": {}}
+            for player in team_points:
+                for elem in teams:
+                    if elem["league"] == league and elem["UUID"] == player:
+                        team_points[player]["Name"] = elem["name"]
+                        penalty_points_dict[player]["Name"] = elem["name"]
+
+    for player in team_points:
+        standing = league_standings.get(player) or {}
+        team_points[player]["F1"] = float(standing.get("f1") or 0.0)
+        team_points[player]["MotoGP"] = float(standing.get("mgp") or 0.0)
+
+    for series, key, points in (("F1", "penalty_f1", penalty_points_f1), ("MotoGP", "penalty_mgp", penalty_points_mgp)):
+        for element in penalties:
+            for player in team_points:
+                if element["league"] == league and element["uuid"] == player:
+                    total_pen = element[key] * points
+                    penalty_points_dict[player][series] = total_pen
+                    team_points[player][series] = team_points[player][series] + total_pen
+
+    def table(pts_of, pen_of):
+        rows = [
+            {"Team": data.get("Name", team_id), "Pts": int(pts_of(data)), "Penalty": int(pen_of(penalty_points_dict.get(team_id, {})))}
+            for team_id, data in team_points.items()
+        ]
+        df = pd.DataFrame(rows).sort_values(by="Pts", ascending=False, kind="stable").reset_index(drop=True)
+        df["Position"] = df.index + 1
+        leader_points = df["Pts"].iloc[0]
+        df["Gap from previous"] = (df["Pts"].shift(1).fillna(leader_points) - df["Pts"]).clip(lower=0).astype(int)
+        df["Gap from leader"] = (leader_points - df["Pts"]).astype(int)
+        return df[STANDINGS_OUTPUT_COLUMNS]
+
+    return (
+        table(lambda d: d["F1"], lambda p: p.get("F1", 0)),
+        table(lambda d: d["MotoGP"], lambda p: p.get("MotoGP", 0)),
+        table(lambda d: d["F1"] + d["MotoGP"], lambda p: p.get("F1", 0) + p.get("MotoGP", 0)),
+    )
+
+# -------------------------------------------------------------------------------------------
+
+def best_of(fn, args, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# -------------------------------------------------------------------------------------------
+
+def main():
+    print(f"{'teams':>6} {'legacy ms':>12} {'keyed ms':>12} {'speedup':>9}")
+    for n in SIZES:
+        teams, standings, penalties = synthetic_league(n, seed=n)
+        args = (teams, LEAGUE, standings, penalties, PENALTY_F1, PENALTY_MGP)
+
+        keyed = best_of(build_standings_tables, args, 5)
+        if n > LEGACY_MAX_TEAMS:
+            print(f"{n:>6} {'-':>12} {keyed * 1000:>12.2f} {'-':>9}")
+            continue
+
+        for old, new in zip(legacy_standings_tables(*args), build_standings_tables(*args)):
+            pd.testing.assert_frame_equal(old, new, check_dtype=False)
+
+        legacy = best_of(legacy_standings_tables, args, 3)
+        print(f"{n:>6} {legacy * 1000:>12.2f} {keyed * 1000:>12.2f} {legacy / keyed:>8.1f}x")
+
+# -------------------------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import os
+import sys
+from supabase import create_client
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logic.artifacts import MANIFEST_DIR, update_manifest
+
+# Ricostruisce gli oggetti _manifest/<tag>/<scope>.json dei bucket a partire dai
+# file già presenti nello storage. Gli extractor scrivono solo la copia locale:
+# da lanciare dopo aver caricato i file di un tag (solo quel tag), o senza
+# argomenti per tutti i tag, per quelli caricati prima del manifest o se il
+# manifest si disallinea:
+#
+#   SUPABASE_URL=... SUPABASE_ANON_KEY=... python computation/build_manifest.py
+#   SUPABASE_URL=... SUPABASE_ANON_KEY=... python computation/build_manifest.py F126 BAH
+
+# -----------------
+buckets = ["F126", "MGP26"]
+# -----------------
+
+only_bucket = sys.argv[1] if len(sys.argv) > 1 else None
+only_tags = set(sys.argv[2:])
+
+supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_ANON_KEY"])
+
+def list_all(bucket, path=""):
+    items = []
+    offset = 0
+    while True:
+        batch = supabase.storage.from_(bucket).list(path, {"limit": 100, "offset": offset}) or []
+        items.extend(batch)
+        if len(batch) < 100:
+            return items
+        offset += 100
+
+for bucket in buckets:
+    if only_bucket and bucket != only_bucket:
+        continue
+    n_tags = 0
+    for folder in list_all(bucket):
+        # le cartelle non hanno metadata (i file nella radice sì)
+        if not folder.get("name") or folder.get("metadata"):
+            continue
+        if folder["name"].rstrip("/") == MANIFEST_DIR:
+            continue
+        tag = folder["name"].rstrip("/")
+        if only_tags and tag not in only_tags:
+            continue
+        files = {}
+        for item in list_all(bucket, tag):
+            if item.get("name") and item.get("metadata"):
+                files[item["name"]] = supabase.storage.from_(bucket).download(f"{tag}/{item['name']}")
+        if files:
+            # senza merge: ogni scope del tag viene riscritto con i soli file presenti
+            update_manifest(supabase, bucket, tag, files)
+            n_tags += 1
+            print(bucket, tag, sorted(files))
+
+    print(bucket, "->", n_tags, "tags")
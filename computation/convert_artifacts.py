@@ -0,0 +1,126 @@
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logic.artifacts import (
+    ARTIFACT_EXT, LEGACY_EXT, MANIFEST_DIR, dumps_artifact, loads_artifact, restricted_unpickle,
+    update_manifest,
+)
+
+# Converte i vecchi artefatti pickle (result_matrix, sprint_poleposition,
+# standings_*, sprint_standings_*, race_final, sprint_final) nel formato
+# colonnare .npz di logic/artifacts.py. Ogni file viene riletto dopo la
+# conversione e confrontato con l'originale; i .pkl non vengono cancellati.
+# Nello storage i nuovi file vengono aggiunti al manifest del tag; per la copia
+# locale il manifest si aggiorna dopo il caricamento con build_manifest.py.
+#
+#   SUPABASE_URL=... SUPABASE_ANON_KEY=... python computation/convert_artifacts.py
+#   python computation/convert_artifacts.py C:/.../Results_repository/F1/    (copia locale)
+
+# -----------------
+buckets = ["F126", "MGP26"]
+# -----------------
+
+CONVERTIBLE = ("result_matrix", "sprint_poleposition", "standings_", "sprint_standings_", "race_final", "sprint_final")
+
+def convertible(name):
+    return name.endswith(LEGACY_EXT) and name.startswith(CONVERTIBLE)
+
+_NAN = object()
+
+def comparable(obj):
+    """
+    Copia confrontabile: NaN come un unico valore (NaN != NaN farebbe fallire il
+    confronto) e scalari numpy come valori Python; liste, tuple e None restano tali.
+    """
+    if isinstance(obj, dict):
+        return {k: comparable(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [comparable(v) for v in obj]
+    if isinstance(obj, tuple):
+        return tuple(comparable(v) for v in obj)
+    if hasattr(obj, "item"):
+        obj = obj.item()
+    if isinstance(obj, float) and math.isnan(obj):
+        return _NAN
+    return obj
+
+def convert(data_bytes, name):
+    obj = restricted_unpickle(data_bytes)
+    out = dumps_artifact(obj)
+    if comparable(loads_artifact(out)) != comparable(obj):
+        raise ValueError(f"{name}: la conversione non è identica all'originale")
+    return out
+
+def npz_name(name):
+    return name[: -len(LEGACY_EXT)] + ARTIFACT_EXT
+
+# -------------------------------------------------------------------------------------------
+
+def convert_local(folder):
+    for tag in sorted(os.listdir(folder)):
+        tag_dir = os.path.join(folder, tag)
+        if not os.path.isdir(tag_dir):
+            continue
+        for name in sorted(os.listdir(tag_dir)):
+            if not convertible(name):
+                continue
+            with open(os.path.join(tag_dir, name), "rb") as f:
+                out = convert(f.read(), name)
+            with open(os.path.join(tag_dir, npz_name(name)), "wb") as f:
+                f.write(out)
+            print(tag, name, "->", npz_name(name))
+
+# -------------------------------------------------------------------------------------------
+
+def convert_storage():
+    from supabase import create_client
+
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_ANON_KEY"])
+
+    def list_all(bucket, path=""):
+        items = []
+        offset = 0
+        while True:
+            batch = supabase.storage.from_(bucket).list(path, {"limit": 100, "offset": offset}) or []
+            items.extend(batch)
+            if len(batch) < 100:
+                return items
+            offset += 100
+
+    for bucket in buckets:
+        storage = supabase.storage.from_(bucket)
+        n_tags = 0
+        for folder in list_all(bucket):
+            # le cartelle non hanno metadata (i file nella radice sì)
+            if not folder.get("name") or folder.get("metadata"):
+                continue
+            if folder["name"].rstrip("/") == MANIFEST_DIR:
+                continue
+            tag = folder["name"].rstrip("/")
+            files = {}
+            for item in list_all(bucket, tag):
+                name = item.get("name") or ""
+                if not item.get("metadata") or not convertible(name):
+                    continue
+                out = convert(storage.download(f"{tag}/{name}"), name)
+                storage.upload(
+                    f"{tag}/{npz_name(name)}",
+                    out,
+                    file_options={"content-type": "application/octet-stream", "upsert": "true"},
+                )
+                files[npz_name(name)] = out
+            if files:
+                update_manifest(supabase, bucket, tag, files, merge=True)
+                n_tags += 1
+                print(bucket, tag, sorted(files))
+
+        print(bucket, "->", n_tags, "tags")
+
+# -------------------------------------------------------------------------------------------
+
+if len(sys.argv) > 1:
+    convert_local(sys.argv[1])
+else:
+    convert_storage()
@@ -4,39 +4,17 @@ record = False
 
 
 import os
+import sys
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
-import pickle
 import json
 from supabase import create_client
 import unicodedata
 import ast
 
-# --------- FUNCTIONS ---------------------------------------------------------
-
-def extract_results(url):
-    response = requests.get(url)
-    contenuto = response.text
-
-    soup = BeautifulSoup(contenuto, "html.parser")
-    table = soup.find('table')
-    rows = table.find_all("tr")
-
-    results = []
-    for row in rows:
-        cells = row.find_all(["td", "th"])
-        row_data = [cell.text.strip() for cell in cells]
-        results.append(row_data)
-
-    results = [line for line in results if line[0].isdigit() or "NC" in line[0]]
-
-    return results
-
-def tmstmp2s(time):
-    result = int(time[0]) * 60000 + int(time[2:4]) * 1000 + int(time[5:8])
-    return result
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logic.artifacts import RESULT_MATRIX, SPRINT_POLE, write_artifact_file
+from computation.pages import fetch_pages, parse_results, time_to_ms, typed_results
 
 # -------- SUPABASE + HUB SETTINGS --------------------------------------------
 
@@ -98,11 +76,19 @@ for gp in circuits_f1:
 
 this_season_racers = [driver["ID"] for driver in marks_f1_new]
 
+# Tutte le pagine della raceweek in parallelo (sessione condivisa, timeout, retry);
+# restano nella cache su disco di computation/pages.py per rilanciare il parsing
+# (--refresh le riscarica comunque)
+page_urls = {"fst": race["url_fst"], "race": race["url_race"], "quali": race["url_quali"]}
+if race["sprint"]:
+    page_urls["sprint"] = race["url_sprint"]
+    page_urls["quali_sprint"] = race["url_quali_sprint"]
+pages = fetch_pages({name: "https://" + path for name, path in page_urls.items()}, refresh="--refresh" in sys.argv)
+
 
 # ------ Sprint race ----------------------------------------------------------
 if race["sprint"]:
-    url = "https://" + race["url_sprint"]
-    sprint_race_results = extract_results(url)
+    sprint_race_results = parse_results(pages["sprint"])
 
     # Obtain final sprint race positions of all pilots
     sprint_race_positions = [
@@ -112,21 +98,21 @@ if race["sprint"]:
         if str(driver) in unicodedata.normalize("NFKC", places[2])
     ]
         
-    # Obtain quali positions for the drivers                    
-    url = "https://" + race["url_quali_sprint"] 
-    sprint_quali_results = extract_results(url)
+    # Obtain quali positions for the drivers (righe tipizzate: posizione, nome, tempo in ms)
+    sprint_quali_results = typed_results(parse_results(pages["quali_sprint"]), time=6)
     sprint_quali_positions = []
 
     for driver in this_season_racers:
         for places in sprint_quali_results:
-            if str(driver) in unicodedata.normalize("NFKC", places[2]):
-                try:
-                    pos = int(places[0])   # conversione a intero
-                    if pos == 1:
-                        sprint_poleman = driver
-                        sprint_pole_time = tmstmp2s(places[6])
-                except ValueError:
-                    raise ValueError(f"❌ Errore: impossibile convertire '{places[0]}' in int")
+            if str(driver) in unicodedata.normalize("NFKC", places["name"]):
+                pos = places["position"]
+                if pos is None:
+                    raise ValueError(f"❌ Errore: posizione non numerica per '{places['name']}'")
+                if pos == 1:
+                    sprint_poleman = driver
+                    sprint_pole_time = places["time_ms"]
+                    if sprint_pole_time is None:
+                        raise ValueError(f"❌ Errore: tempo della pole non valido per '{places['name']}'")
                 sprint_quali_positions.append([driver, pos])
 
     # Obtain bonus for sprint race
@@ -199,21 +185,17 @@ if race["sprint"]:
         for racer in sprint_race_positions:
             if driver[0] in racer[0]:
                 driver.append(racer[1])
-    file = folder + tag + "/sprint_poleposition.pkl"
-    with open(file, "wb") as tbw:
-        sprint_poleman = sprint_poleman+"AAA"
-        pickle.dump(sprint_poleman, tbw)  
+    file = folder + tag + "/" + SPRINT_POLE
+    sprint_poleman = sprint_poleman+"AAA"
+    write_artifact_file(file, sprint_poleman)
 
 #---------- Principal race ----------------------------------------------------
-url = "https://" + race["url_fst"]
-fastest_lap = extract_results(url)
+fastest_lap = parse_results(pages["fst"])
 fastest_lap = fastest_lap[0]
-fastest_time = fastest_lap[6].replace(":",".")
-fastest_time = tmstmp2s(fastest_time)
+fastest_time = time_to_ms(fastest_lap[6], required=True)
 fastest_driver = fastest_lap[2][:-3]
 #%%
-url = "https://" + race["url_race"]
-race_results = extract_results(url)
+race_results = parse_results(pages["race"])
 
 # Obtain final race positions of all pilots
 race_positions = [
@@ -224,21 +206,21 @@ race_positions = [
 ]
     
 # Obtain quali positions for the drivers                    
-url = "https://" + race["url_quali"] 
-quali_results = extract_results(url)
+quali_results = typed_results(parse_results(pages["quali"]), time=6)
 #%%
 quali_positions = []
 
 for driver in this_season_racers:
     for places in quali_results:
-        if str(driver) in unicodedata.normalize("NFKC", places[2]):
-            try:
-                pos = int(places[0])   # conversione a intero
-                if pos == 1:
-                    poleman = driver
-                    pole_time = tmstmp2s(places[6])
-            except ValueError:
-                raise ValueError(f"❌ Errore: impossibile convertire '{places[0]}' in int")
+        if str(driver) in unicodedata.normalize("NFKC", places["name"]):
+            pos = places["position"]
+            if pos is None:
+                raise ValueError(f"❌ Errore: posizione non numerica per '{places['name']}'")
+            if pos == 1:
+                poleman = driver
+                pole_time = places["time_ms"]
+                if pole_time is None:
+                    raise ValueError(f"❌ Errore: tempo della pole non valido per '{places['name']}'")
             quali_positions.append([driver, pos])
 
 # Obtain Q, pole and qtr bonus
@@ -336,9 +318,11 @@ for driver in results:
 # Results dump
 files = {"Grand Prix": results, "Sprint race": sprint_results}
 
-file = folder + tag + "/result_matrix.pkl"
-with open(file, "wb") as tbw:
-    pickle.dump(files, tbw)       
+# formato colonnare (logic/artifacts.py), non più pickle
+file = folder + tag + "/" + RESULT_MATRIX
+write_artifact_file(file, files)
+# i file vengono caricati a mano nel bucket: il manifest si aggiorna dopo, con
+#   python computation/build_manifest.py F126 <tag>
 
 
 
@@ -3,40 +3,18 @@ max_vel_gp = "Joan Mir"
 sprint_pole_time = 88809
 
 import os
+import sys
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
-import pickle
 import pandas as pd
 import json
 from supabase import create_client
 import unicodedata
 import ast
 
-# --------- FUNCTIONS ---------------------------------------------------------
-
-def extract_results(url):
-    response = requests.get(url)
-    contenuto = response.text
-
-    soup = BeautifulSoup(contenuto, "html.parser")
-    table = soup.find('table')
-    rows = table.find_all("tr")
-
-    results = []
-    for row in rows:
-        cells = row.find_all(["td", "th"])
-        row_data = [cell.text.strip() for cell in cells]
-        results.append(row_data)
-
-    results = [line for line in results if line[0].isdigit() or "NC" in line[0]]
-
-    return results
-
-def tmstmp2s(time):
-    result = int(time[0]) * 60000 + int(time[2:4]) * 1000 + int(time[5:8])
-    return result
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from logic.artifacts import RESULT_MATRIX, SPRINT_POLE, write_artifact_file
+from computation.pages import fetch_page, make_session, read_classifications, time_to_ms
 
 # -------- SUPABASE + HUB SETTINGS --------------------------------------------
 
@@ -98,27 +76,21 @@ for gp in circuits_mgp:
 
 this_season_racers = [driver["ID"] for driver in marks_mgp_new]
 url = "https://" + race["url_race"]
-headers = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/127.0.0.1 Safari/537.36"
-    )
-}
-
-url = "https://" + race["url_race"]
-
-response = requests.get(url, headers=headers)
 
-if response.status_code == 200:
-    tables = pd.read_html(response.text)
+# sessione con User-Agent da browser, timeout e retry; la pagina resta nella
+# cache su disco di computation/pages.py per rilanciare il parsing
+# (con FPK_FIXTURES=<cartella> viene letta da uno snapshot salvato, con --refresh
+# viene riscaricata comunque)
+html = fetch_page(url, make_session(), refresh="--refresh" in sys.argv)
+# classifiche riconosciute dal contenuto: prima la sprint, poi la gara; il parsing
+# in streaming si ferma dopo la tabella della gara MotoGP
+classified = read_classifications(html, limit=2 if race["sprint"] else 1)
 
 #%%
 # ------ Sprint race ----------------------------------------------------------
 
 if race["sprint"]: 
-    sprint_race_results = tables[22]
-    sprint_race_results = sprint_race_results.values.tolist()
+    sprint_race_results = classified[0]
 
     # Obtain final sprint race positions of all pilots
     sprint_race_positions = [
@@ -133,7 +105,7 @@ if race["sprint"]:
     
 #%%
     sprint_fastest_lap = sprint_race_results[-2][0].split("–")[1].split("(")[0].strip(" ")
-    sprint_time = tmstmp2s(sprint_fastest_lap.replace(":","."))
+    sprint_time = time_to_ms(sprint_fastest_lap, required=True)
 
     sprint_driver = sprint_race_results[-2][0].split("-")[0].split("(")[0].split(":")[1]
     sprint_driver = sprint_driver.strip(" ")
@@ -239,18 +211,16 @@ if race["sprint"]:
         else:
             driver.append(False)
             
-    file = folder + tag + "/sprint_poleposition.pkl"
-    with open(file, "wb") as tbw:
-        pickle.dump(sprint_poleman, tbw)       
+    file = folder + tag + "/" + SPRINT_POLE
+    write_artifact_file(file, sprint_poleman)
 
             
         
 #%%
 #---------- Principal race ----------------------------------------------------
-race_results = tables[24]
-race_results = race_results.values.tolist()
+race_results = classified[1] if race["sprint"] else classified[0]
 fastest_lap = race_results[-2][0].split("–")[1].split("(")[0].strip(" ")
-time = tmstmp2s(fastest_lap.replace(":","."))
+time = time_to_ms(fastest_lap, required=True)
 
 driver = race_results[-2][0].split("-")[0].split("(")[0].split(":")[1]
 fastest_driver = driver.strip(" ")
@@ -352,9 +322,11 @@ for driver in results:
 # Results dump
 files = {"Grand Prix": results, "Sprint race": sprint_results}
 
-file = folder + tag + "/result_matrix.pkl"
-with open(file, "wb") as tbw:
-    pickle.dump(files, tbw)       
+# formato colonnare (logic/artifacts.py), non più pickle
+file = folder + tag + "/" + RESULT_MATRIX
+write_artifact_file(file, files)
+# i file vengono caricati a mano nel bucket: il manifest si aggiorna dopo, con
+#   python computation/build_manifest.py MGP26 <tag>
 
 
 
@@ -0,0 +1,347 @@
+import hashlib
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Download e parsing delle pagine dei risultati per gli extractor (script offline).
+# Una sola requests.Session con pool di connessioni, timeout e retry con backoff
+# esponenziale; le pagine di una raceweek partono in parallelo e vengono salvate
+# in una cache su disco (un file per URL), così il parsing si può rilanciare
+# senza riscaricare. Una pagina in cache più vecchia di PAGE_CACHE_TTL secondi
+# (FPK_PAGE_CACHE_TTL, 0 = mai) viene riscaricata: le classifiche cambiano con
+# le penalità dopo la gara. refresh=True, FPK_REFRESH=1 o --refresh negli
+# extractor ignorano la cache.
+#
+# Modalità fixture: con FPK_FIXTURES=<cartella> (o fixtures=...) le pagine
+# vengono lette solo da snapshot HTML salvati, mai dalla rete; i file hanno lo
+# stesso nome di quelli della cache, quindi una cache copiata è già un set di
+# fixture. benchmarks/bench_parse.py misura il parsing su questi snapshot.
+
+PAGE_CACHE_DIR = os.environ.get(
+    "FPK_PAGE_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".page_cache"),
+)
+FIXTURE_DIR = os.environ.get("FPK_FIXTURES")
+PAGE_CACHE_TTL = float(os.environ.get("FPK_PAGE_CACHE_TTL", 3600))
+REFRESH = os.environ.get("FPK_REFRESH", "").lower() in ("1", "true", "yes")
+FETCH_WORKERS = 5
+TIMEOUT = (5, 30)           # (connessione, lettura) in secondi
+RETRIES = 3
+BACKOFF = 0.5               # 0.5s, 1s, 2s tra i tentativi
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/127.0.0.1 Safari/537.36"
+    )
+}
+
+# --------- SESSION -----------------------------------------------------------
+
+def make_session(headers=None, retries=RETRIES, backoff=BACKOFF, pool_size=FETCH_WORKERS):
+    session = requests.Session()
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(headers or DEFAULT_HEADERS)
+    return session
+
+# --------- CACHE -------------------------------------------------------------
+
+def page_filename(url):
+    """Nome leggibile e stabile per lo snapshot di un URL (host e percorso, più un hash corto)."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", url.split("://", 1)[-1]).strip("_")[:120]
+    return f"{slug}_{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}.html"
+
+def cache_path(url, cache_dir=None):
+    return os.path.join(cache_dir or PAGE_CACHE_DIR, page_filename(url))
+
+def cache_fresh(path, ttl=None):
+    """True se lo snapshot esiste e non è più vecchio di ttl secondi (ttl <= 0: non scade)."""
+    ttl = PAGE_CACHE_TTL if ttl is None else ttl
+    try:
+        age = time.time() - os.path.getmtime(path)
+    except OSError:
+        return False
+    return ttl <= 0 or age < ttl
+
+# --------- FETCH -------------------------------------------------------------
+
+def fetch_page(url, session=None, timeout=TIMEOUT, cache_dir=None, refresh=False, fixtures=None, ttl=None):
+    """
+    HTML della pagina: dalla cache su disco se c'è e non è scaduta, altrimenti
+    scaricato e salvato. In modalità fixture legge solo lo snapshot e non usa
+    mai la rete (né refresh né ttl).
+    """
+    fixtures = fixtures or FIXTURE_DIR
+    if fixtures:
+        path = cache_path(url, fixtures)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Fixture mancante per {url}: {path}")
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    path = cache_path(url, cache_dir)
+    if not (refresh or REFRESH) and cache_fresh(path, ttl):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    response = (session or make_session()).get(url, timeout=timeout)
+    response.raise_for_status()
+    html = response.text
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(tmp, path)
+    return html
+
+def fetch_pages(urls, session=None, timeout=TIMEOUT, cache_dir=None, refresh=False, fixtures=None,
+                ttl=None, max_workers=FETCH_WORKERS):
+    """{nome: url} -> {nome: html}, download in parallelo sulla stessa sessione."""
+    session = session or make_session()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            name: pool.submit(fetch_page, url, session, timeout, cache_dir, refresh, fixtures, ttl)
+            for name, url in urls.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+# --------- PARSING -----------------------------------------------------------
+# Parser in streaming con lxml.iterparse: legge il documento fino alla tabella
+# che serve e si ferma, senza costruire l'albero completo (BeautifulSoup) né
+# convertire tutte le tabelle della pagina (pd.read_html). Senza lxml si torna
+# ai vecchi percorsi BeautifulSoup / pandas, con lo stesso risultato.
+# benchmarks/bench_parse.py confronta i due percorsi sulle fixture.
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# stessa normalizzazione degli spazi di pd.read_html
+_RE_WHITESPACE = re.compile(r"[\r\n]+|\s{2,}")
+_RE_LAP_TIME = re.compile(r"^(?:(\d+):)?(\d{1,2})[.,](\d{1,3})$")
+
+def _hidden(el):
+    return "display:none" in (el.get("style") or "").replace(" ", "").lower()
+
+def _cell_text(cell, displayed_only):
+    """Testo di una cella come BeautifulSoup .text (senza commenti); opzionalmente senza gli elementi nascosti."""
+    parts = []
+
+    def walk(el):
+        if el.text:
+            parts.append(el.text)
+        for child in el:
+            if isinstance(child.tag, str) and not (displayed_only and _hidden(child)):
+                walk(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    walk(cell)
+    return "".join(parts)
+
+def _table_rows(table, expand_spans=False, displayed_only=False):
+    """
+    Righe di una tabella lxml come liste di testo.
+    expand_spans=False: celle così come sono, come find_all("tr") + cell.text.strip()
+    (anche le celle delle tabelle annidate, perché find_all è ricorsivo).
+    expand_spans=True: come pd.read_html(...).values.tolist(): colspan/rowspan
+    ripetuti, intestazione scartata (le righe di <thead> o, senza <thead>, solo
+    le righe di sole <th> in cima: i piè di pagina "Fastest lap" di Wikipedia
+    sono <th colspan> e restano), righe di <tfoot> in fondo, righe corte
+    completate con None.
+    """
+    trs = list(table.iter("tr"))
+    if not expand_spans:
+        return [
+            [_cell_text(c, displayed_only).strip() for c in tr.iter("td", "th")]
+            for tr in trs
+        ]
+
+    def cells_of(tr):
+        return [c for c in tr if isinstance(c.tag, str) and c.tag in ("td", "th")]
+
+    def section(tr):
+        parent = tr.getparent()
+        return parent.tag if parent is not None and parent.tag in ("thead", "tfoot") else "tbody"
+
+    head = [tr for tr in trs if section(tr) == "thead"]
+    body = [tr for tr in trs if section(tr) == "tbody"]
+    foot = [tr for tr in trs if section(tr) == "tfoot"]
+    if not head:
+        while body and all(c.tag == "th" for c in cells_of(body[0])):
+            head.append(body.pop(0))
+
+    rows = []
+    pending = {}                # colonna -> [righe rimanenti, testo] per i rowspan
+    width = 0
+    for tr in head + body + foot:
+        cells = cells_of(tr)
+        header = tr in head
+        row = []
+        col = 0
+
+        def fill_pending():
+            nonlocal col
+            while col in pending:
+                span = pending[col]
+                row.append(span[1])
+                span[0] -= 1
+                if span[0] == 0:
+                    del pending[col]
+                col += 1
+
+        for cell in cells:
+            fill_pending()
+            text = _RE_WHITESPACE.sub(" ", _cell_text(cell, displayed_only)).strip()
+            colspan = max(1, int(cell.get("colspan") or 1))
+            rowspan = max(1, int(cell.get("rowspan") or 1))
+            for _ in range(colspan):
+                if rowspan > 1:
+                    pending[col] = [rowspan - 1, text]
+                row.append(text)
+                col += 1
+        fill_pending()
+
+        width = max(width, len(row))
+        if not header and row:
+            rows.append(row)
+
+    return [row + [None] * (width - len(row)) for row in rows]
+
+def iter_tables(html):
+    """
+    Tabelle esterne della pagina (elementi lxml) man mano che vengono chiuse nel
+    documento, nell'ordine di apertura come soup.find("table"): una tabella
+    annidata in una cella arriva dentro la sua tabella esterna, non prima.
+    """
+    data = html.encode("utf-8") if isinstance(html, str) else html
+    depth = 0
+    for event, table in etree.iterparse(BytesIO(data), events=("start", "end"), tag="table", html=True,
+                                        recover=True, encoding="utf-8"):
+        if event == "start":
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 0:
+            yield table
+
+def _is_results_row(line):
+    return bool(line) and (line[0].isdigit() or "NC" in line[0])
+
+def _parse_results_bs4(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    table = soup.find('table')
+    rows = table.find_all("tr")
+
+    results = []
+    for row in rows:
+        cells = row.find_all(["td", "th"])
+        row_data = [cell.text.strip() for cell in cells]
+        results.append(row_data)
+
+    results = [line for line in results if line[0].isdigit() or "NC" in line[0]]
+
+    return results
+
+def parse_results(html):
+    """Righe (testo delle celle) della prima tabella della pagina: solo classificati o NC."""
+    if etree is None:
+        return _parse_results_bs4(html)
+    for table in iter_tables(html):
+        # la prima tabella aperta (con le righe delle tabelle annidate, come
+        # find_all("tr")): il resto del documento non viene letto
+        return [line for line in _table_rows(table) if _is_results_row(line)]
+    raise ValueError("Nessuna tabella nella pagina")
+
+def _is_classification(rows):
+    return len(rows) > 0 and len(rows[0]) >= 3 and any(
+        isinstance(row[0], str) and "Fastest lap" in row[0] for row in rows
+    )
+
+def classification_tables(tables):
+    """
+    Tabelle di classifica (MotoGP, pagina della gara) tra quelle di pd.read_html:
+    sono le sole con una riga "Fastest lap: ..." in prima colonna. Nell'ordine
+    della pagina: sprint MotoGP, gara MotoGP, poi le altre classi.
+    Sostituisce gli indici fissi (tables[22] / tables[24]), che cambiano
+    appena la pagina guadagna o perde una tabella.
+    """
+    found = []
+    for table in tables:
+        if table.shape[1] < 3:
+            continue
+        first = table.iloc[:, 0].astype(str)
+        if first.str.contains("Fastest lap", regex=False).any():
+            found.append(table)
+    return found
+
+def read_classifications(html, limit=None):
+    """
+    Righe (come pd.read_html(...).values.tolist()) delle tabelle di classifica
+    della pagina, in ordine; con limit si ferma dopo le prime limit tabelle.
+    """
+    if etree is None:
+        import pandas as pd
+
+        found = classification_tables(pd.read_html(StringIO(html)))
+        return [table.values.tolist() for table in found[:limit]]
+
+    found = []
+    for outer in iter_tables(html):
+        # la tabella esterna e quelle annidate, in ordine di apertura come pd.read_html
+        for table in outer.iter("table"):
+            rows = _table_rows(table, expand_spans=True, displayed_only=True)
+            if _is_classification(rows):
+                found.append(rows)
+                if limit is not None and len(found) >= limit:
+                    return found
+        outer.clear()
+    return found
+
+def time_to_ms(text, required=False):
+    """
+    "1:21.491" / "59.8" -> millisecondi; None se non è un tempo sul giro
+    (ValueError con required, come il vecchio tmstmp2s degli extractor).
+    """
+    match = _RE_LAP_TIME.match((text or "").strip())
+    if not match:
+        if required:
+            raise ValueError(f"Tempo sul giro non valido: {text!r}")
+        return None
+    minutes, seconds, fraction = match.groups()
+    return int(minutes or 0) * 60000 + int(seconds) * 1000 + int(fraction.ljust(3, "0"))
+
+def typed_results(rows, position=0, name=2, time=None):
+    """
+    Righe tipizzate: {"position": int o None (NC, ritirato), "name": str,
+    "time_ms": int o None}. Gli indici dicono in che colonna sono i campi.
+    """
+    out = []
+    for row in rows:
+        pos = row[position] if len(row) > position else None
+        out.append({
+            "position": int(pos) if isinstance(pos, str) and pos.isdigit() else None,
+            "name": row[name] if len(row) > name else None,
+            "time_ms": time_to_ms(row[time]) if time is not None and len(row) > time else None,
+        })
+    return out
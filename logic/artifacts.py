@@ -0,0 +1,414 @@
+import hashlib
+import io
+import json
+import os
+import pickle
+from datetime import datetime, timezone
+import numpy as np
+
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+
+# Artefatti dei risultati nello storage (bucket F126 / MGP26, una cartella per tag).
+# Modulo senza streamlit: le funzioni che leggono o scrivono lo storage ricevono il
+# client supabase come parametro, così lo usano sia le schermate sia gli script
+# offline in computation/.
+
+# -------------------------
+# Manifest del bucket
+# -------------------------
+# Un piccolo oggetto JSON per ogni (tag, scope), in _manifest/<tag>/<scope>.json,
+# elenca i file scritti da chi possiede lo scope con dimensione, sha256 e righe:
+#   {"version": 2, "tag": "BAH", "scope": "<league>",
+#    "files": {"standings_<league>.npz": {"size": 1234, "sha256": "...", "updated_at": "...", "rows": 20},
+#              "sprint_standings_<league>.npz": {...}}}
+# Lo scope è la league per standings_* / sprint_standings_* (scritti dal
+# raceweek_computer di quella league) e "_results" per result_matrix e
+# sprint_poleposition (scritti in locale dagli extractor e registrati da
+# computation/build_manifest.py dopo il caricamento nel bucket: il manifest elenca
+# solo file già nello storage). Ogni writer tocca solo il proprio oggetto:
+# league diverse sullo stesso tag non si sovrascrivono.
+# Il manifest è solo un acceleratore: un oggetto o una voce mancante vuol dire
+# "non so", e chi legge torna allo storage (download del file o lista della cartella).
+MANIFEST_DIR = "_manifest"
+MANIFEST_VERSION = 2
+RESULTS_SCOPE = "_results"
+
+# -------------------------
+# Formato colonnare degli artefatti
+# -------------------------
+# Gli artefatti sono file .npz (zip di array NumPy, letti con allow_pickle=False):
+# ogni tabella di righe (liste di lunghezza variabile) diventa una colonna
+# tipizzata per posizione più un array con la lunghezza di ogni riga; lo schema
+# JSON in "__schema__" dice formato, versione, tipo delle colonne e forma
+# dell'oggetto originale (dict di tabelle, tabella singola o valore scalare).
+# Tipi di colonna: bool, int, float, str; le colonne miste (es. posizione "1" /
+# "DNF") sono "json", un valore JSON per cella, così tornano identiche.
+# I vecchi .pkl restano leggibili (solo tipi base, vedi restricted_unpickle).
+ARTIFACT_FORMAT = "fpk-columnar"
+ARTIFACT_VERSION = 1
+ARTIFACT_EXT = ".npz"
+LEGACY_EXT = ".pkl"
+
+RESULT_MATRIX = "result_matrix.npz"
+SPRINT_POLE = "sprint_poleposition.npz"
+
+# -------------------------------------------------------------------------------------------
+
+def standings_filename(league, sprint=False):
+    return f"sprint_standings_{league}.npz" if sprint else f"standings_{league}.npz"
+
+# -------------------------------------------------------------------------------------------
+
+def legacy_filename(filename):
+    """Nome del vecchio artefatto pickle corrispondente (result_matrix.npz -> result_matrix.pkl)."""
+    if filename.endswith(ARTIFACT_EXT):
+        return filename[: -len(ARTIFACT_EXT)] + LEGACY_EXT
+    return filename
+
+# -------------------------------------------------------------------------------------------
+
+_MISSING = object()
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+# -------------------------------------------------------------------------------------------
+
+def _column_type(values):
+    if any(v is None for v in values):
+        return "json"
+    if all(isinstance(v, bool) for v in values):
+        return "bool"
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in values):
+        return "int"
+    if all(isinstance(v, float) for v in values):
+        return "float"
+    if all(isinstance(v, str) for v in values):
+        return "str"
+    return "json"
+
+# -------------------------------------------------------------------------------------------
+
+_FILL = {"bool": False, "int": 0, "float": np.nan, "str": ""}
+_DTYPES = {"bool": np.bool_, "int": np.int64, "float": np.float64}
+
+def _encode_column(values):
+    """Colonna j della tabella come (tipo, array); le righe più corte hanno un valore di riempimento."""
+    present = [v for v in values if v is not _MISSING]
+    kind = _column_type(present)
+    if kind == "json":
+        cells = ["" if v is _MISSING else json.dumps(v) for v in values]
+        return kind, np.array(cells, dtype=np.str_)
+    cells = [_FILL[kind] if v is _MISSING else v for v in values]
+    if kind == "str":
+        return kind, np.array(cells, dtype=np.str_)
+    return kind, np.array(cells, dtype=_DTYPES[kind])
+
+# -------------------------------------------------------------------------------------------
+
+def _encode_table(rows, prefix, arrays):
+    for r, row in enumerate(rows):
+        if not isinstance(row, (list, tuple)):
+            raise TypeError(f"Artifact row {r} is {type(row).__name__}, expected list or tuple")
+    tuples = [r for r, row in enumerate(rows) if isinstance(row, tuple)]
+    container = "tuple" if isinstance(rows, tuple) else "list"
+    rows = [[_plain(v) for v in row] for row in rows]
+    lengths = np.array([len(row) for row in rows], dtype=np.int32)
+    width = int(lengths.max()) if len(rows) else 0
+    columns = []
+    for j in range(width):
+        values = [row[j] if j < len(row) else _MISSING for row in rows]
+        kind, array = _encode_column(values)
+        arrays[f"{prefix}_c{j}"] = array
+        columns.append(kind)
+    arrays[f"{prefix}_len"] = lengths
+    table = {"rows": len(rows), "columns": columns}
+    # solo se servono, per ricostruire esattamente il contenitore e le righe tuple
+    if container == "tuple":
+        table["container"] = container
+    if tuples:
+        table["tuples"] = tuples
+    return table
+
+# -------------------------------------------------------------------------------------------
+
+def dumps_artifact(obj):
+    """
+    Serializza un artefatto nel formato colonnare: dict {sessione: righe}
+    (result_matrix), lista di righe (classifiche) o valore scalare (poleman).
+    Le righe devono essere liste o tuple (TypeError altrimenti, anche per le
+    stringhe); tabelle None e righe tuple vengono segnate nello schema.
+    """
+    arrays = {}
+    schema = {"format": ARTIFACT_FORMAT, "version": ARTIFACT_VERSION}
+    if isinstance(obj, dict):
+        schema["root"] = "dict"
+        schema["tables"] = []
+        for i, (name, rows) in enumerate(obj.items()):
+            if rows is not None and not isinstance(rows, (list, tuple)):
+                raise TypeError(f"Artifact table {name!r} is {type(rows).__name__}, expected list, tuple or None")
+            table = _encode_table(rows if rows is not None else [], f"t{i}", arrays)
+            table["name"] = name
+            if rows is None:
+                table["none"] = True
+            schema["tables"].append(table)
+    elif isinstance(obj, (list, tuple)):
+        schema["root"] = "list"
+        schema["tables"] = [_encode_table(obj, "t0", arrays)]
+    else:
+        schema["root"] = "scalar"
+        schema["value"] = _plain(obj)
+
+    arrays["__schema__"] = np.array(json.dumps(schema))
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+# -------------------------------------------------------------------------------------------
+
+def is_columnar(data_bytes):
+    return isinstance(data_bytes, (bytes, bytearray)) and bytes(data_bytes[:4]) == b"PK\x03\x04"
+
+# -------------------------------------------------------------------------------------------
+
+def _open_artifact(data_bytes):
+    npz = np.load(io.BytesIO(data_bytes), allow_pickle=False)
+    schema = json.loads(str(npz["__schema__"]))
+    if schema.get("format") != ARTIFACT_FORMAT or schema.get("version") != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported artifact format: {schema.get('format')} v{schema.get('version')}")
+    return npz, schema
+
+# -------------------------------------------------------------------------------------------
+
+def _decode_column(kind, array):
+    if kind == "json":
+        return [json.loads(v) if v else None for v in array.tolist()]
+    return array.tolist()
+
+# -------------------------------------------------------------------------------------------
+
+def _table_index(schema, table):
+    if table is None:
+        return 0
+    for i, entry in enumerate(schema["tables"]):
+        if entry.get("name") == table:
+            return i
+    raise KeyError(table)
+
+# -------------------------------------------------------------------------------------------
+
+def loads_artifact(data_bytes):
+    """Ricostruisce l'oggetto originale (stesse liste, stessi tipi Python)."""
+    npz, schema = _open_artifact(data_bytes)
+    if schema["root"] == "scalar":
+        return schema.get("value")
+
+    tables = []
+    for i, entry in enumerate(schema["tables"]):
+        lengths = npz[f"t{i}_len"].tolist()
+        columns = [_decode_column(kind, npz[f"t{i}_c{j}"]) for j, kind in enumerate(entry["columns"])]
+        rows = [[columns[j][r] for j in range(n)] for r, n in enumerate(lengths)]
+        for r in entry.get("tuples", []):
+            rows[r] = tuple(rows[r])
+        if entry.get("none"):
+            rows = None
+        elif entry.get("container") == "tuple":
+            rows = tuple(rows)
+        tables.append((entry.get("name"), rows))
+
+    if schema["root"] == "dict":
+        return {name: rows for name, rows in tables}
+    return tables[0][1]
+
+# -------------------------------------------------------------------------------------------
+
+def load_artifact_columns(data_bytes, columns, table=None):
+    """
+    Solo le colonne richieste (indici di posizione nella riga) di una tabella:
+    {indice: lista di valori, None dove la riga è più corta}. Gli altri array
+    dello zip non vengono decompressi.
+    """
+    npz, schema = _open_artifact(data_bytes)
+    i = _table_index(schema, table)
+    entry = schema["tables"][i]
+    lengths = npz[f"t{i}_len"].tolist()
+    out = {}
+    for j in columns:
+        if j >= len(entry["columns"]):
+            out[j] = [None] * len(lengths)
+            continue
+        values = _decode_column(entry["columns"][j], npz[f"t{i}_c{j}"])
+        out[j] = [v if j < n else None for v, n in zip(values, lengths)]
+    return out
+
+# -------------------------------------------------------------------------------------------
+
+def load_artifact_table(data_bytes, columns, table=None):
+    """
+    Righe di una tabella con le stesse lunghezze dell'originale ma solo le
+    colonne richieste decodificate (le altre None), per chi legge poche
+    posizioni della riga. I vecchi pickle vengono decodificati per intero.
+    """
+    if not is_columnar(data_bytes):
+        obj = restricted_unpickle(data_bytes)
+        if table is None:
+            return obj
+        if table not in obj:
+            raise KeyError(table)
+        return obj[table]
+    npz, schema = _open_artifact(data_bytes)
+    lengths = npz[f"t{_table_index(schema, table)}_len"].tolist()
+    values = load_artifact_columns(data_bytes, columns, table)
+    rows = [[None] * n for n in lengths]
+    for j, column in values.items():
+        for r, n in enumerate(lengths):
+            if j < n:
+                rows[r][j] = column[r]
+    return rows
+
+# -------------------------------------------------------------------------------------------
+
+def artifact_rows(data_bytes):
+    """Righe totali di un artefatto colonnare (solo lo schema viene letto); None altrimenti."""
+    if not is_columnar(data_bytes):
+        return None
+    try:
+        _, schema = _open_artifact(data_bytes)
+    except Exception:
+        return None
+    if schema["root"] == "scalar":
+        return None
+    return sum(table["rows"] for table in schema["tables"])
+
+# -------------------------------------------------------------------------------------------
+
+class _PlainUnpickler(pickle.Unpickler):
+    """Unpickler che rifiuta qualunque classe o funzione: solo tipi base."""
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"Global not allowed in artifact: {module}.{name}")
+
+def restricted_unpickle(data_bytes):
+    """Legge i vecchi artefatti .pkl (liste/dict/str/numeri) senza eseguire codice."""
+    return _PlainUnpickler(io.BytesIO(data_bytes)).load()
+
+# -------------------------------------------------------------------------------------------
+
+def decode_artifact(data_bytes):
+    """Artefatto colonnare o vecchio pickle, riconosciuto dal contenuto."""
+    if is_columnar(data_bytes):
+        return loads_artifact(data_bytes)
+    return restricted_unpickle(data_bytes)
+
+# -------------------------------------------------------------------------------------------
+
+def manifest_path(tag, scope):
+    return f"{MANIFEST_DIR}/{tag}/{scope}.json"
+
+# -------------------------------------------------------------------------------------------
+
+def manifest_scope(filename):
+    """Scope del manifest di un file: la league per le classifiche, "_results" per gli altri artefatti."""
+    stem = os.path.splitext(filename)[0]
+    for prefix in ("sprint_standings_", "standings_"):
+        if stem.startswith(prefix):
+            return stem[len(prefix):]
+    return RESULTS_SCOPE
+
+# -------------------------------------------------------------------------------------------
+
+def manifest_entry(data_bytes):
+    """
+    Voce del manifest per un file: dimensione, sha256 e ora di scrittura (UTC);
+    per gli artefatti colonnari anche il numero di righe, che basta a sapere
+    se ci sono risultati senza scaricare il file.
+    """
+    entry = {
+        "size": len(data_bytes),
+        "sha256": hashlib.sha256(data_bytes).hexdigest(),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    rows = artifact_rows(data_bytes)
+    if rows is not None:
+        entry["rows"] = rows
+    return entry
+
+# -------------------------------------------------------------------------------------------
+
+def parse_manifest(raw):
+    """{nome file: voce} da bytes/str JSON; None se vuoto, illeggibile o di un'altra versione."""
+    if not raw:
+        return None
+    try:
+        manifest = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    files = manifest.get("files")
+    return files if isinstance(files, dict) else None
+
+# -------------------------------------------------------------------------------------------
+
+def load_manifest(client, bucket, tag, scope):
+    """Voci dell'oggetto manifest del tag/scope; None se manca o non si legge (= non so)."""
+    try:
+        raw = client.storage.from_(bucket).download(manifest_path(tag, scope))
+    except Exception:
+        return None
+    return parse_manifest(raw)
+
+# -------------------------------------------------------------------------------------------
+
+def write_manifest(client, bucket, tag, scope, entries):
+    """Carica (upsert) l'oggetto manifest del tag/scope con le voci {nome file: voce}."""
+    manifest = {"version": MANIFEST_VERSION, "tag": tag, "scope": scope, "files": entries}
+    client.storage.from_(bucket).upload(
+        manifest_path(tag, scope),
+        json.dumps(manifest, sort_keys=True).encode("utf-8"),
+        file_options={
+            "content-type": "application/json",
+            "upsert": "true"
+        }
+    )
+
+# -------------------------------------------------------------------------------------------
+
+def update_manifest(client, bucket, tag, files, merge=False):
+    """
+    Registra i file del tag ({nome file: bytes}) negli oggetti manifest dei loro
+    scope. Senza merge l'oggetto viene riscritto con i soli file passati
+    (raceweek_computer scrive sempre entrambe le classifiche della league, quindi
+    nessuna lettura-modifica-scrittura); con merge le voci si aggiungono a quelle
+    già presenti (convert_artifacts.py aggiunge i .npz accanto ai .pkl).
+    Ritorna {scope: voci scritte}.
+    """
+    by_scope = {}
+    for filename, data_bytes in files.items():
+        by_scope.setdefault(manifest_scope(filename), {})[filename] = manifest_entry(data_bytes)
+    for scope, entries in by_scope.items():
+        if merge:
+            entries = {**(load_manifest(client, bucket, tag, scope) or {}), **entries}
+        write_manifest(client, bucket, tag, scope, entries)
+        by_scope[scope] = entries
+    return by_scope
+
+# -------------------------------------------------------------------------------------------
+
+def write_artifact_file(path, obj):
+    """Scrive obj in formato colonnare su disco; ritorna i bytes scritti (per il manifest)."""
+    data_bytes = dumps_artifact(obj)
+    with open(path, "wb") as f:
+        f.write(data_bytes)
+    return data_bytes
+
+# -------------------------------------------------------------------------------------------
+
+def read_artifact_file(path):
+    """Legge un artefatto da disco; se il .npz non c'è ancora usa il vecchio .pkl."""
+    if not os.path.exists(path) and os.path.exists(legacy_filename(path)):
+        path = legacy_filename(path)
+    with open(path, "rb") as f:
+        return decode_artifact(f.read())
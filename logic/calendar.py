@@ -0,0 +1,79 @@
+from datetime import timedelta
+import numpy as np
+import pandas as pd
+
+from logic.names import fix_mojibake
+
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+
+# Modello del calendario, senza dipendenze da streamlit/supabase: gare F1 e MotoGP
+# parsate una volta, raggruppate per raceweek (gare nella stessa data) e numerate.
+# Solo lo stato rispetto a oggi (completata, in corso, in arrivo) si ricalcola a
+# ogni rerun della schermata.
+
+UNDERGOING_DAYS = 2
+UPCOMING_DAYS = 7
+
+# -------------------------------------------------------------------------------------------
+
+def build_calendar_model(races_f1, races_mgp):
+    """
+    {"raceweeks": [[gara, ...], ...], "dates": array di date}: gare delle due
+    serie (categoria, nome e circuito riparati, when_dt, _rw_number) in ordine
+    cronologico, raggruppate su una colonna datetime di pandas.
+    """
+    races = [dict(race, category="F1") for race in races_f1]
+    races += [dict(race, category="MGP") for race in races_mgp]
+    if not races:
+        return {"raceweeks": [], "dates": np.array([], dtype="datetime64[D]")}
+
+    df = pd.DataFrame({"when": [race["when"] for race in races]})
+    df["when_dt"] = pd.to_datetime(df["when"], format="%Y-%m-%d")
+    # ordinamento stabile: a parità di data prima F1 poi MotoGP, come prima
+    df = df.sort_values("when_dt", kind="stable")
+
+    raceweeks = []
+    for rw_number, (when_dt, group) in enumerate(df.groupby("when_dt", sort=True), start=1):
+        when_dt = when_dt.to_pydatetime()
+        rw = []
+        for i in group.index:
+            race = races[i]
+            race["name"] = fix_mojibake(race.get("name", race.get("ID", "Unknown Race")))
+            race["circuit"] = fix_mojibake(race.get("circuit", "Circuit unknown"))
+            race["when_dt"] = when_dt
+            race["_rw_number"] = rw_number
+            rw.append(race)
+        raceweeks.append(rw)
+
+    dates = np.array([rw[0]["when_dt"].date() for rw in raceweeks], dtype="datetime64[D]")
+    return {"raceweeks": raceweeks, "dates": dates}
+
+# -------------------------------------------------------------------------------------------
+
+def raceweek_indexes(model, today):
+    """(indice della raceweek appena conclusa, indice della prossima), None se non ci sono."""
+    dates = model["dates"]
+    split = int(np.searchsorted(dates, np.datetime64(today, "D"), side="right"))
+    past_idx = split - 1 if split > 0 else None
+    next_idx = split if split < len(dates) else None
+    return past_idx, next_idx
+
+# -------------------------------------------------------------------------------------------
+
+def display_order(raceweeks, past_idx, next_idx):
+    """Prima la raceweek appena conclusa e la prossima, poi tutte le altre in ordine."""
+    first = [idx for idx in (past_idx, next_idx) if idx is not None]
+    return [raceweeks[idx] for idx in first] + [rw for idx, rw in enumerate(raceweeks) if idx not in first]
+
+# -------------------------------------------------------------------------------------------
+
+def race_status(race_day, today):
+    if race_day < today:
+        return "| ✅ Completed"
+    if race_day <= today + timedelta(days=UNDERGOING_DAYS):
+        return "| 🔄 Undergoing"
+    if race_day <= today + timedelta(days=UPCOMING_DAYS):
+        return "| 📅 Upcoming"
+    return ""
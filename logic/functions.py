@@ -1,15 +1,33 @@
 import ast
+import hashlib
 import html as _html
 import json
 import re
-import unicodedata
-import io
-import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
 import streamlit as st
 from typing import Any, List, Dict
 from supabase import create_client
+from logic.standings import STANDINGS_TABLE, standings_from_points
+from logic.calendar import build_calendar_model
+from logic.textmetrics import line_height, wrapped_lines
+from logic.artifacts import (
+    load_manifest, MANIFEST_DIR, standings_filename, legacy_filename, decode_artifact, load_artifact_table,
+    SPRINT_POLE, RESULT_MATRIX,
+)
+from logic.names import (
+    MANUAL_CORRECTIONS,
+    canonical_key,
+    fix_mojibake,
+    normalize_fullname_for_keys,
+    normalize_name,
+    pilot_color_keys,
+)
 
 
 
@@ -20,16 +38,6 @@ from supabase import create_client
 #TABLE_SPACING_PX = 0.5
 #DEFAULT_ROW_PADDING = '4px 10px'
 
-# -------------------------
-# Correzioni manuali globali
-# -------------------------
-MANUAL_CORRECTIONS = {
-    "ferman aldeguer": "fermin aldeguer",
-    "maverick viaales": "maverick vinales",
-    "jorge martan": "jorge martin",
-    "raaol fernandez": "raul fernandez",
-}
-
 # -------------------------------------------------------------------------------------------
 # -------------------------------------------------------------------------------------------
 # -------------------------------------------------------------------------------------------
@@ -113,46 +121,31 @@ def _estimate_rows_height(rows,
                           container_width_px=1000,
                           left_pct=0.65,
                           right_pct=0.35,
-                          avg_char_px=7.0,
-                          line_height_px=18,
                           vertical_padding_px=6,   
                           min_h=24,                
                           max_h=8000,
                           safety_mul=1.0,          
-                          per_row_padding_px=0):
-    left_w = int(container_width_px * left_pct) - 32
-    right_w = int(container_width_px * right_pct) - 32
-    left_chars_per_line = max(20, int(left_w / max(1.0, avg_char_px)))
-    right_chars_per_line = max(10, int(right_w / max(1.0, avg_char_px)))
-
-# -------------------------------------------------------------------------------------------
-
-    def _count_wrapped_lines(text, chars_per_line):
-        if not text:
-            return 1
-        s = re.sub(r"\s+", " ", str(text).strip())
-        if not s:
-            return 1
-        tokens = s.split(' ')
-        lines = 0
-        cur = 0
-        for token in tokens:
-            token_len = len(token) + 1
-            if cur + token_len > chars_per_line:
-                lines += 1
-                cur = token_len
-            else:
-                cur += token_len
-        if cur > 0:
-            lines += 1
-        return max(1, lines)
+                          per_row_padding_px=0,
+                          row_padding_x_px=8,
+                          label_font_px=13,
+                          value_font_px=14):
+    """
+    Altezza in px di una tabella di _render_simple_table_html (righe (label, valore))
+    e se serve lo scroll. Le righe di testo di ogni cella sono misurate con le
+    larghezze dei glifi del font (logic/textmetrics.py, memoizzate per testo e
+    larghezza): etichetta 600 a label_font_px, valore 700 a value_font_px.
+    per_row_padding_px è il padding verticale più il bordo di ogni riga.
+    """
+    left_w = container_width_px * left_pct - 2 * row_padding_x_px
+    right_w = container_width_px * right_pct - 2 * row_padding_x_px
+    label_line = line_height(label_font_px)
+    value_line = line_height(value_font_px)
 
     total_px = 0
     for label, value in rows:
-        lab_lines = _count_wrapped_lines(label, left_chars_per_line)
-        val_lines = _count_wrapped_lines(value, right_chars_per_line)
-        row_lines = max(lab_lines, val_lines)
-        total_px += row_lines * line_height_px + per_row_padding_px
+        lab_lines = wrapped_lines(str(label), left_w, label_font_px, True)
+        val_lines = wrapped_lines(str(value), right_w, value_font_px, True)
+        total_px += max(lab_lines * label_line, val_lines * value_line) + per_row_padding_px
 
     est = int(vertical_padding_px + total_px)
     est = int(est * safety_mul)
@@ -178,16 +171,6 @@ def safe_load_team_list(raw):
 
 # -------------------------------------------------------------------------------------------
 
-def normalize(name):
-    if not isinstance(name, str):
-        return ""
-    s = unicodedata.normalize("NFKD", name)
-    s = s.encode("ascii", "ignore").decode("ascii")
-    s = s.lower().strip()
-    s = re.sub(r"[^a-z0-9]", "", s)
-    return s
-
-# -------------------------------------------------------------------------------------------
     
 def normalize_category(cat):
     if not isinstance(cat, str):
@@ -205,20 +188,6 @@ def normalize_category(cat):
 
 # -------------------------------------------------------------------------------------------
 
-def normalize_fullname_for_keys(name):
-        if not isinstance(name, str):
-            return ""
-        s = unicodedata.normalize("NFC", name).strip()
-        if "," in s:
-            parts = [p.strip() for p in s.split(",") if p.strip()]
-            if len(parts) >= 2:
-                s = parts[1] + " " + parts[0]
-            else:
-                s = parts[0]
-        s = re.sub(r"\s+", " ", s)
-        return unicodedata.normalize("NFC", s)
-
-# -------------------------------------------------------------------------------------------
     
 def parse_list_field(v):
         if v is None:
@@ -250,22 +219,6 @@ def parse_list_field(v):
 
 # -------------------------------------------------------------------------------------------
 
-def fix_mojibake(s):
-    try:
-        if not isinstance(s, str):
-            return s
-        s_nfc = unicodedata.normalize("NFC", s)
-        if "Ã" in s_nfc or "Â" in s_nfc:
-            try:
-                repaired = s_nfc.encode("latin-1").decode("utf-8")
-                return unicodedata.normalize("NFC", repaired)
-            except Exception:
-                return s_nfc
-        return s_nfc
-    except Exception:
-        return s
-
-# -------------------------------------------------------------------------------------------
 
 def build_pilot_colors(teams):
     pilot_colors = {}
@@ -302,6 +255,14 @@ def build_pilot_colors(teams):
 
         main_hex = parse_color(main_raw)
         second_hex = parse_color(second_raw)
+        # forma estesa #rrggbb, così get_color può restituire il valore dell'indice
+        main_hex = safe_rgb_to_hex(parse_color_field(main_hex)) if len(main_hex) == 4 else main_hex
+
+        # chiavi del team in minuscolo, calcolate una volta per team
+        lower_keys = {}
+        for k in team.keys():
+            if team.get(k):
+                lower_keys.setdefault(k.lower(), k)
 
         for cat_label, variants in cat_variants.items():
             raw_pilots = None
@@ -309,11 +270,9 @@ def build_pilot_colors(teams):
                 if v in team and team[v]:
                     raw_pilots = team[v]
                     break
-                for k in team.keys():
-                    if k.lower() == v.lower() and team.get(k):
-                        raw_pilots = team[k]
-                        break
-                if raw_pilots:
+                k = lower_keys.get(v.lower())
+                if k is not None:
+                    raw_pilots = team[k]
                     break
 
             if not raw_pilots:
@@ -341,25 +300,38 @@ def build_pilot_colors(teams):
    
     for pilot, cat_label, main_hex, second_hex in combined_pilots:
         cat_norm = normalize_category(cat_label)
-        parsed_name = normalize_fullname_for_keys(pilot) 
-        parts = parsed_name.split()
-        surname = parts[-1] if parts else parsed_name
-
+        key, key_surname, surname = pilot_color_keys(pilot, cat_norm)
+        entry = (main_hex, second_hex, surname)
+        pilot_colors[(cat_norm, key)] = entry
         if cat_norm == "motogp":
-            key_full = normalize(parsed_name) 
-            key_surname = normalize(surname) 
-            display = surname
-            pilot_colors[(cat_norm, key_full)] = (main_hex, second_hex, display)
-            pilot_colors[(cat_norm, key_surname)] = (main_hex, second_hex, display)
-        else:
-            key = normalize(surname)
-            display = surname
-            pilot_colors[(cat_norm, key)] = (main_hex, second_hex, display)
+            pilot_colors[(cat_norm, key_surname)] = entry
 
     return pilot_colors
 
 # -------------------------------------------------------------------------------------------
 
+PILOT_COLORS_TTL = 300
+_pilot_colors_cache = {}         # league -> (scadenza, indice)
+
+def pilot_colors_for_league(league):
+    """
+    Indice pilot_colors dei soli team della league, condiviso dal processo e
+    ricostruito dopo PILOT_COLORS_TTL secondi o dopo invalidate_tables("teams").
+    """
+    key = str(league)
+    with _table_cache_lock:
+        entry = _pilot_colors_cache.get(key)
+    if entry is not None and entry[0] >= time.monotonic():
+        return entry[1]
+
+    index = build_pilot_colors(cached_rows("teams", (("league", key),)))
+    with _table_cache_lock:
+        _pilot_colors_cache[key] = (time.monotonic() + PILOT_COLORS_TTL, index)
+    return index
+
+# -------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=1024)
 def color_box_html(main, second):
     return (
         f'<span style="display:inline-block;width:16px;height:16px;'
@@ -374,18 +346,11 @@ def format_name(fullname, pilot_colors, category):
         if fullname is None or (isinstance(fullname, float) and np.isnan(fullname)):
             return ""
         cat_norm = normalize_category(category or "")
-        parsed_name = normalize_fullname_for_keys(str(fullname))
-        parts = parsed_name.split()
-        surname = parts[-1] if parts else parsed_name
-
-        if cat_norm == "motogp":
-            key = normalize(parsed_name) 
-        else:
-            key = normalize(surname)
+        key, key_surname, surname = pilot_color_keys(str(fullname), cat_norm)
 
         main, second, display = pilot_colors.get((cat_norm, key), (None, None, None))
         if (display is None or display == "") and cat_norm == "motogp":
-            fallback = pilot_colors.get((cat_norm, normalize(surname)))
+            fallback = pilot_colors.get((cat_norm, key_surname))
             if fallback:
                 main, second, display = fallback
 
@@ -405,22 +370,15 @@ def format_name(fullname, pilot_colors, category):
 def get_color(fullname, pilot_colors, category):
     try:
         cat_norm = normalize_category(category or "")
-        parsed_name = normalize_fullname_for_keys(str(fullname))
-        parts = parsed_name.split()
-        surname = parts[-1] if parts else parsed_name
+        key, key_surname, _ = pilot_color_keys(str(fullname), cat_norm)
 
-        if cat_norm == "motogp":
-            keys_to_try = [normalize(parsed_name), normalize(surname)]
-        else:
-            keys_to_try = [normalize(surname)]
+        keys_to_try = (key, key_surname) if cat_norm == "motogp" else (key,)
 
         for k in keys_to_try:
             v = pilot_colors.get((cat_norm, k))
             if v:
-                raw_color = v[0]  
-                rgb = parse_color_field(raw_color)
-                if rgb:
-                    return safe_rgb_to_hex(rgb)
+                # l'indice contiene già colori esadecimali normalizzati
+                return v[0]
 
         return "#888888"
     except Exception as e:
@@ -429,15 +387,39 @@ def get_color(fullname, pilot_colors, category):
 
 # -------------------------------------------------------------------------------------------
 
+def download_artifact_bytes(bucket_name, file_path):
+    """
+    Bytes di un artefatto dei risultati: prima il file .npz colonnare, poi il
+    vecchio .pkl per i tag non ancora convertiti. Rilancia l'errore se non
+    esiste nessuno dei due.
+    """
+    storage = supabase.storage.from_(bucket_name)
+    try:
+        return storage.download(file_path)
+    except Exception:
+        legacy_path = legacy_filename(file_path)
+        if legacy_path == file_path:
+            raise
+        return storage.download(legacy_path)
+
+# -------------------------------------------------------------------------------------------
+
+def download_artifact(bucket_name, file_path):
+    """Scarica e decodifica un artefatto dei risultati (logic/artifacts.py)."""
+    return decode_artifact(download_artifact_bytes(bucket_name, file_path))
+
+# -------------------------------------------------------------------------------------------
+
+def results_bucket(category):
+    return "F126" if category == "F1" else "MGP26"
+
+# -------------------------------------------------------------------------------------------
+
 def get_results(race, category, sprint, user):
-    file_path = f"{race}/sprint_standings_{user["league"]}.pkl" if sprint else f"{race}/standings_{user["league"]}.pkl"
-    if category == "F1":
-        bucket_name = "F126"
-    else:
-        bucket_name = "MGP26"
+    file_path = f"{race}/{standings_filename(user['league'], sprint)}"
+    bucket_name = results_bucket(category)
     try:
-        data_bytes = supabase.storage.from_(bucket_name).download(file_path)
-        return pickle.load(io.BytesIO(data_bytes))
+        return download_artifact(bucket_name, file_path)
     except Exception as e:
         print(f"Errore nel download di {file_path} dal bucket {bucket_name}: {e}")
         return None
@@ -445,26 +427,65 @@ def get_results(race, category, sprint, user):
 # -------------------------------------------------------------------------------------------
         
 def sprint_pole(race, category):
-    file_path = f"{race}/sprint_poleposition.pkl"
+    file_path = f"{race}/{SPRINT_POLE}"
     bucket_name = category
     try:
-        data_bytes = supabase.storage.from_(bucket_name).download(file_path)
-        return pickle.load(io.BytesIO(data_bytes))
+        return download_artifact(bucket_name, file_path)
     except Exception as e:
         print(f"Errore nel download di {file_path} dal bucket {bucket_name}: {e}")
         return None
 
 # -------------------------------------------------------------------------------------------
 
+def _has_results(data):
+    if not data:
+        return False
+    for row in data:
+        if any(x != -99 and x is not None for x in row):
+            return True
+    return False
+
+# -------------------------------------------------------------------------------------------
+
+def probe_results(race, tag, user):
+    """
+    (disponibile, classifica o None) per la gara principale del tag nella league.
+    Risponde dal manifest della league per il tag (numero di righe di
+    standings_{league}.npz) senza scaricare il file. Un manifest o una voce
+    mancante non vuol dire "non disponibile": in quel caso (e per i vecchi .pkl,
+    senza numero di righe) scarica la classifica e la ritorna, così
+    race_results_screen non la riscarica. Se il download fallisce decide la lista
+    della cartella: file assente -> non disponibile, file presente o storage che
+    non risponde -> errore, non "non disponibile".
+    """
+    league = user["league"]
+    filename = standings_filename(league)
+    bucket = results_bucket(race["category"])
+    try:
+        entries = load_bucket_manifest(bucket, tag, str(league)) or {}
+        entry = entries.get(filename) or entries.get(legacy_filename(filename))
+        if entry is not None and entry.get("rows") is not None:
+            return entry["rows"] > 0, None
+    except Exception as e:
+        print(f"Errore nel manifest per {tag}: {e}")
+
+    try:
+        data = download_artifact(bucket, f"{tag}/{filename}")
+    except Exception as e:
+        errors = []
+        names = {(item.get("name") or "").lower() for item in list_all(bucket, tag, errors)}
+        if errors:
+            raise RuntimeError(errors[0]) from e
+        if filename.lower() in names or legacy_filename(filename).lower() in names:
+            raise RuntimeError(f"Errore nel download di {tag}/{filename} dal bucket {bucket}: {e}") from e
+        return False, None
+    return _has_results(data), data
+
+# -------------------------------------------------------------------------------------------
+
 def results_exist(race, tag, user):
     try:
-        data = get_results(tag, race["category"], False, user)
-        if not data:
-            return False
-        for row in data:
-            if any(x != -99 and x is not None for x in row):
-                return True
-        return False
+        return probe_results(race, tag, user)[0]
     except Exception as e:
         print(f"Errore in results_exist: {e}")
         return False
@@ -592,7 +613,8 @@ def safe_unpickle(data_bytes):
     try:
         if not isinstance(data_bytes, (bytes, bytearray)):
             return data_bytes
-        return pickle.loads(data_bytes)
+        # formato colonnare o vecchio pickle con soli tipi base
+        return decode_artifact(data_bytes)
     except Exception:
         try:
             text = data_bytes.decode("utf-8")
@@ -602,17 +624,6 @@ def safe_unpickle(data_bytes):
 
 # -------------------------------------------------------------------------------------------
 
-def normalize_name(name):
-    if not name:
-        return ""
-    name = str(name).strip().lower()
-    name = unicodedata.normalize('NFKD', name)
-    name = "".join(c for c in name if not unicodedata.combining(c))
-    name = re.sub(r"[^a-z\s]", "", name)
-    name = re.sub(r"\s+", " ", name).strip()
-    return name
-
-# -------------------------------------------------------------------------------------------
 
 def clean_team_drivers(raw_drivers):
     if raw_drivers is None:
@@ -666,16 +677,183 @@ def extract_driver_and_points(elem: Any, f1_mode=True):
 # -------------------------------------------------------------------------------------------
 
 @st.cache_data(ttl=60, show_spinner=False)
-def load_table(name: str):
+def load_table(name: str, filters: tuple = (), columns: str = "*"):
+    """
+    Righe di una tabella, in cache per 60s. filters è una tupla di coppie
+    (colonna, valore) applicate come .eq() lato server e columns la proiezione:
+    entrambe fanno parte della chiave di cache, quindi ogni league ha la sua copia.
+    """
     try:
-        res = supabase.from_(name).select("*").execute()
+        query = supabase.from_(name).select(columns)
+        for column, value in filters:
+            query = query.eq(column, value)
+        res = query.execute()
         return res.data or []
     except Exception:
         return []
 
+# -------------------------------------------------------------------------------------------
+# Cache condivisa di processo per le tabelle di riferimento
+# -------------------------------------------------------------------------------------------
+
+# A differenza di st.cache_data / session_state questa cache vive nel modulo ed
+# è condivisa da tutte le sessioni del processo: durante il weekend di gara i
+# visitatori leggono la stessa copia. Chi scrive su una di queste tabelle deve
+# chiamare invalidate_tables().
+TABLE_CACHE_TTLS = {
+    "championship_f1_new": 600,
+    "championship_mgp_new": 600,
+    "racers_f1_new": 300,
+    "racers_mgp_new": 300,
+    "marks_f1_new": 300,
+    "marks_mgp_new": 300,
+    "teams": 60,
+}
+TABLE_CACHE_DEFAULT_TTL = 60
+TABLE_CACHE_SIZE = 256
+
+_table_cache = OrderedDict()     # (name, filters, columns) -> (scadenza, righe)
+_table_cache_lock = threading.Lock()
+_table_fetch_locks = {}          # una fetch alla volta per chiave
+
+# -------------------------------------------------------------------------------------------
+
+def _table_cache_get(key):
+    with _table_cache_lock:
+        entry = _table_cache.get(key)
+        if entry is None:
+            return None
+        expires, rows = entry
+        if expires < time.monotonic():
+            del _table_cache[key]
+            return None
+        _table_cache.move_to_end(key)
+        return rows
+
+# -------------------------------------------------------------------------------------------
+
+def cached_rows(name: str, filters: tuple = (), columns: str = "*"):
+    """
+    Read-through sulla cache di processo: righe di name filtrate con .eq() per
+    ogni coppia (colonna, valore) di filters. TTL per tabella (TABLE_CACHE_TTLS),
+    eviction LRU oltre TABLE_CACHE_SIZE chiavi. Gli errori di fetch non vengono
+    messi in cache e risalgono al chiamante.
+    Ritorna copie delle righe: gli schermi possono modificarle senza toccare la cache.
+    """
+    key = (name, tuple(filters), columns)
+    rows = _table_cache_get(key)
+    if rows is not None:
+        return [dict(row) for row in rows]
+
+    with _table_cache_lock:
+        fetch_lock = _table_fetch_locks.setdefault(key, threading.Lock())
+
+    with fetch_lock:
+        # un'altra sessione potrebbe averla appena caricata
+        rows = _table_cache_get(key)
+        if rows is not None:
+            return [dict(row) for row in rows]
+
+        query = supabase.from_(name).select(columns)
+        for column, value in filters:
+            query = query.eq(column, value)
+        try:
+            rows = query.execute().data or []
+        except Exception:
+            # niente lock orfani per chiavi che non entrano in cache
+            with _table_cache_lock:
+                if _table_fetch_locks.get(key) is fetch_lock:
+                    del _table_fetch_locks[key]
+            raise
+
+        ttl = TABLE_CACHE_TTLS.get(name, TABLE_CACHE_DEFAULT_TTL)
+        with _table_cache_lock:
+            _table_cache[key] = (time.monotonic() + ttl, rows)
+            _table_cache.move_to_end(key)
+            while len(_table_cache) > TABLE_CACHE_SIZE:
+                old_key, _ = _table_cache.popitem(last=False)
+                _table_fetch_locks.pop(old_key, None)
+    return [dict(row) for row in rows]
+
+# -------------------------------------------------------------------------------------------
+
+def invalidate_tables(*names):
+    """
+    Hook da chiamare dopo una scrittura: scarta le copie in cache di processo
+    delle tabelle indicate (tutte se non ne viene passata nessuna) e svuota la
+    cache di load_table.
+    """
+    with _table_cache_lock:
+        for key in list(_table_cache):
+            if not names or key[0] in names:
+                del _table_cache[key]
+                _table_fetch_locks.pop(key, None)
+        if not names or "teams" in names:
+            _pilot_colors_cache.clear()
+        if not names or set(names) & set(CALENDAR_TABLES):
+            _calendar_cache.clear()
+    load_table.clear()
+
 # -------------------------------------------------------------------------------------------
 
-def list_all(bucket: str, path: str = "") -> List[dict]:
+CALENDAR_TABLES = ("championship_f1_new", "championship_mgp_new")
+CALENDAR_TTL = 600
+_calendar_cache = {}             # "season" -> (scadenza, modello)
+
+def calendar_model():
+    """
+    Modello del calendario (logic/calendar.py) condiviso dal processo: le gare
+    vengono lette, parsate e raggruppate una volta ogni CALENDAR_TTL secondi
+    (o dopo invalidate_tables sulle tabelle championship). Da non modificare.
+    """
+    with _table_cache_lock:
+        entry = _calendar_cache.get("season")
+    if entry is not None and entry[0] >= time.monotonic():
+        return entry[1]
+
+    model = build_calendar_model(*(cached_rows(name) for name in CALENDAR_TABLES))
+    with _table_cache_lock:
+        _calendar_cache["season"] = (time.monotonic() + CALENDAR_TTL, model)
+    return model
+
+# -------------------------------------------------------------------------------------------
+
+def rebuild_league_standings(league):
+    """
+    Ricalcola nel database da points_per_race_* le righe di league_standings
+    della league (funzione security definer di sql/league_standings.sql: con la
+    chiave anon la tabella è in sola lettura). Ritorna {team id: riga}.
+    """
+    res = supabase.rpc("rebuild_league_standings", {"p_league": league}).execute()
+    return {row["id"]: row for row in (res.data or [])}
+
+# -------------------------------------------------------------------------------------------
+
+def load_league_standings(league):
+    """
+    Totali grezzi (senza penalità) dei team della league: una sola lettura di
+    league_standings. Se la tabella manca, non risponde o non ha righe per la
+    league i totali vengono sommati da points_per_race_*, come prima della tabella.
+    """
+    try:
+        res = supabase.from_(STANDINGS_TABLE).select("id,f1,mgp").eq("league", league).execute()
+        rows = {row["id"]: row for row in (res.data or [])}
+        if rows:
+            return rows
+    except Exception:
+        pass
+    points_f1 = supabase.from_("points_per_race_f1").select("*").eq("league", league).execute().data or []
+    points_mgp = supabase.from_("points_per_race_mgp").select("*").eq("league", league).execute().data or []
+    return standings_from_points(league, points_f1, points_mgp)
+
+# -------------------------------------------------------------------------------------------
+
+def list_all(bucket: str, path: str = "", errors: List[str] = None) -> List[dict]:
+    """
+    Tutti gli elementi di bucket/path, paginando a blocchi di 100. Se errors è
+    una lista i messaggi di errore vengono raccolti lì invece di st.warning
+    (serve nei thread, dove st.* non è disponibile).
+    """
     all_items = []
     limit = 100
     offset = 0
@@ -684,7 +862,11 @@ def list_all(bucket: str, path: str = "") -> List[dict]:
         try:
             batch = supabase.storage.from_(bucket).list(path, {"limit": limit, "offset": offset}) or []
         except Exception as e:
-            st.warning(f"Errore nel listare {bucket}/{path} con offset {offset}: {e}")
+            message = f"Errore nel listare {bucket}/{path} con offset {offset}: {e}"
+            if errors is None:
+                st.warning(message)
+            else:
+                errors.append(message)
             break
 
         if not batch:
@@ -699,49 +881,341 @@ def list_all(bucket: str, path: str = "") -> List[dict]:
 
 # -------------------------------------------------------------------------------------------
 
-def load_standings_from_buckets(user, buckets: List[str] = ["F126", "MGP26"]) -> Dict[str, Dict[str, Dict[str, Any]]]:
-    standings_data: Dict[str, Dict[str, Dict[str, Any]]] = {}
+STORAGE_WORKERS = 8
+ARTIFACT_CACHE_SIZE = 512
 
-    for bucket in buckets:
-        standings_data[bucket] = {}
+_artifact_cache = OrderedDict()  # (bucket, path, etag) -> oggetto decodificato
+_artifact_cache_lock = threading.Lock()
 
-        race_folders = list_all(bucket, "")
-        race_names = [r["name"].rstrip("/") for r in race_folders if r.get("name")]
+def _storage_etag(item):
+    """ETag di un elemento restituito da list(); None se lo storage non lo fornisce."""
+    metadata = item.get("metadata") or {}
+    return metadata.get("eTag") or metadata.get("etag") or item.get("updated_at")
 
-        for race_name in race_names:
-            race_dict = {}
-            files = list_all(bucket, race_name)
-            file_names = [f["name"] for f in files if "name" in f]
-            file_names_lower = [fn.lower() for fn in file_names]
+# -------------------------------------------------------------------------------------------
 
-            main_file = next((fn for fn, fn_l in zip(file_names, file_names_lower)
-                              if fn_l.endswith(f"standings_{user["league"]}.pkl") and "sprint" not in fn_l), None)
-            sprint_file = next((fn for fn, fn_l in zip(file_names, file_names_lower)
-                                if fn_l.endswith(f"sprint_standings_{user["league"]}.pkl")), None)
+def load_storage_object(bucket, path, etag=None):
+    """
+    Scarica e decodifica (safe_unpickle) bucket/path. Con un etag il risultato
+    resta in cache di processo per (bucket, path, etag): un file riscritto ha un
+    etag nuovo e viene riletto.
+    """
+    key = (bucket, path, etag)
+    if etag is not None:
+        with _artifact_cache_lock:
+            if key in _artifact_cache:
+                _artifact_cache.move_to_end(key)
+                return _artifact_cache[key]
+
+    value = safe_unpickle(supabase.storage.from_(bucket).download(path))
+
+    if etag is not None:
+        with _artifact_cache_lock:
+            _artifact_cache[key] = value
+            _artifact_cache.move_to_end(key)
+            while len(_artifact_cache) > ARTIFACT_CACHE_SIZE:
+                _artifact_cache.popitem(last=False)
+    return value
 
-            if main_file:
-                try:
-                    b = supabase.storage.from_(bucket).download(f"{race_name}/{main_file}")
-                    race_dict["standings"] = safe_unpickle(b)
-                except Exception as e:
-                    st.warning(f"Errore {bucket}/{race_name}/{main_file}: {e}")
-                    race_dict["standings"] = None
-            else:
-                race_dict["standings"] = None
+# -------------------------------------------------------------------------------------------
 
-            if sprint_file:
-                try:
-                    b = supabase.storage.from_(bucket).download(f"{race_name}/{sprint_file}")
-                    race_dict["sprint_standings"] = safe_unpickle(b)
-                except Exception as e:
-                    st.warning(f"Errore {bucket}/{race_name}/{sprint_file}: {e}")
-                    race_dict["sprint_standings"] = None
-            else:
-                race_dict["sprint_standings"] = None
+MANIFEST_TTL = 30
+_manifest_cache = {}             # (bucket, tag, scope) -> (scadenza, voci o None)
 
-            standings_data[bucket][race_name] = race_dict
+def load_bucket_manifest(bucket, tag, scope):
+    """
+    Voci del manifest del tag/scope (logic/artifacts.py), in cache di processo
+    per MANIFEST_TTL secondi; None (= non so) se l'oggetto non c'è.
+    """
+    key = (bucket, tag, scope)
+    with _artifact_cache_lock:
+        entry = _manifest_cache.get(key)
+    if entry is not None and entry[0] >= time.monotonic():
+        return entry[1]
+    entries = load_manifest(supabase, bucket, tag, scope)
+    with _artifact_cache_lock:
+        _manifest_cache[key] = (time.monotonic() + MANIFEST_TTL, entries)
+    return entries
+
+# -------------------------------------------------------------------------------------------
+
+def invalidate_manifest(bucket=None):
+    with _artifact_cache_lock:
+        if bucket is None:
+            _manifest_cache.clear()
+        else:
+            for key in [key for key in _manifest_cache if key[0] == bucket]:
+                del _manifest_cache[key]
+    invalidate_race_results(bucket)
+
+# -------------------------------------------------------------------------------------------
+# Risultati di una gara (schermata race_results)
+# -------------------------------------------------------------------------------------------
+
+RACE_RESULTS_TTL = 120
+RACE_RESULTS_MISSING_TTL = 15     # classifica della gara non ancora pubblicata
+RACE_RESULTS_CACHE_SIZE = 64
+WARM_WORKERS = 2
+
+_race_results_cache = OrderedDict()  # (bucket, tag, league) -> (scadenza, risultati)
+_race_results_lock = threading.Lock()
+_race_results_fetch_locks = {}
+_warm_pool = ThreadPoolExecutor(max_workers=WARM_WORKERS, thread_name_prefix="warm-results")
+_warming = set()
+_warm_attempts = {}              # (bucket, tag, league) -> ultimo riscaldamento avviato
+
+# -------------------------------------------------------------------------------------------
+
+def _race_results_key(race, user):
+    return (results_bucket(race["category"]), race.get("tag"), user["league"])
+
+def _race_results_get(key):
+    with _race_results_lock:
+        return _race_results_get_locked(key)
+
+def _race_results_get_locked(key):
+    entry = _race_results_cache.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        del _race_results_cache[key]
+        return None
+    _race_results_cache.move_to_end(key)
+    return entry[1]
+
+# -------------------------------------------------------------------------------------------
+
+# posizioni della riga del Grand Prix lette da race_results_screen (pole, giro
+# veloce, pit-stop / velocità massima, pilota del giorno)
+MATRIX_BADGE_COLUMNS = (0, 1, 2, 8, 9, 10)
+
+def _result_matrix_or_none(category, tag):
+    """
+    Sessione "Grand Prix" della result_matrix con le sole colonne dei badge
+    decodificate (load_artifact_table); None se il file non c'è.
+    """
+    try:
+        data_bytes = download_artifact_bytes(category, f"{tag}/{RESULT_MATRIX}")
+        try:
+            return {"Grand Prix": load_artifact_table(data_bytes, MATRIX_BADGE_COLUMNS, "Grand Prix")}
+        except KeyError:
+            # sessione con un altro nome: matrice intera
+            return decode_artifact(data_bytes)
+    except Exception:
+        return None
+
+# -------------------------------------------------------------------------------------------
+
+def race_results(race, user, race_data=None):
+    """
+    Tutto quello che mostra race_results_screen per un tag: classifiche sprint
+    e gara della league, poleman della sprint e result_matrix, scaricati in
+    parallelo. {"sprint", "pole", "race", "matrix"}, None per i file mancanti.
+    Resta in cache di processo per (bucket, tag, league) per RACE_RESULTS_TTL
+    secondi, o RACE_RESULTS_MISSING_TTL se la classifica della gara manca (così
+    ogni render non riscarica una gara non ancora pubblicata); una sola fetch
+    alla volta per chiave, così un click durante il riscaldamento in background
+    aspetta quello invece di riscaricare.
+    race_data è la classifica già scaricata da probe_results, se c'è: vince su
+    una voce "mancante" in cache.
+    Niente chiamate st.*: gira anche nei thread di warm_race_results.
+    """
+    key = _race_results_key(race, user)
+
+    def cached():
+        results = _race_results_get(key)
+        if results is not None and results["race"] is None and race_data is not None:
+            return None
+        return results
+
+    results = cached()
+    if results is not None:
+        return results
+
+    with _race_results_lock:
+        fetch_lock = _race_results_fetch_locks.setdefault(key, threading.Lock())
+
+    with fetch_lock:
+        results = cached()
+        if results is not None:
+            return results
+
+        category, tag = race["category"], race.get("tag")
+        jobs = {"matrix": (_result_matrix_or_none, (category, tag))}
+        if race_data is None:
+            jobs["race"] = (get_results, (tag, category, False, user))
+        if race.get("sprint"):
+            jobs["sprint"] = (get_results, (tag, category, True, user))
+            jobs["pole"] = (sprint_pole, (tag, category))
+
+        with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+            futures = {field: pool.submit(fn, *args) for field, (fn, args) in jobs.items()}
+            results = {"sprint": None, "pole": None, "race": race_data}
+            results.update({field: future.result() for field, future in futures.items()})
+
+        # senza classifica della gara la voce scade presto: i risultati potrebbero arrivare a breve
+        ttl = RACE_RESULTS_TTL if results["race"] is not None else RACE_RESULTS_MISSING_TTL
+        with _race_results_lock:
+            _race_results_cache[key] = (time.monotonic() + ttl, results)
+            _race_results_cache.move_to_end(key)
+            while len(_race_results_cache) > RACE_RESULTS_CACHE_SIZE:
+                old_key, _ = _race_results_cache.popitem(last=False)
+                _race_results_fetch_locks.pop(old_key, None)
+    return results
+
+# -------------------------------------------------------------------------------------------
+
+def warm_race_results(races, user):
+    """
+    Scarica in background (pool di WARM_WORKERS thread) i risultati delle gare
+    indicate, di solito la raceweek appena conclusa, così la schermata dei
+    risultati si apre subito. Le gare in cache (anche come "mancanti"), già in
+    corso (in background o in primo piano) o tentate da meno di
+    RACE_RESULTS_MISSING_TTL secondi vengono saltate.
+    """
+    now = time.monotonic()
+    for race in races:
+        if not race.get("tag"):
+            continue
+        key = _race_results_key(race, user)
+        with _race_results_lock:
+            if key in _warming or _race_results_get_locked(key) is not None:
+                continue
+            fetch_lock = _race_results_fetch_locks.get(key)
+            if fetch_lock is not None and fetch_lock.locked():
+                continue
+            last = _warm_attempts.get(key)
+            if last is not None and now - last < RACE_RESULTS_MISSING_TTL:
+                continue
+            _warming.add(key)
+            _warm_attempts[key] = now
+            for old_key in [k for k, t in _warm_attempts.items() if now - t >= RACE_RESULTS_MISSING_TTL]:
+                del _warm_attempts[old_key]
+
+        def warm(race=race, key=key):
+            try:
+                race_results(race, {"league": user["league"]})
+            except Exception as e:
+                print(f"Errore nel riscaldamento dei risultati {key}: {e}")
+            finally:
+                with _race_results_lock:
+                    _warming.discard(key)
+
+        _warm_pool.submit(warm)
+
+# -------------------------------------------------------------------------------------------
+
+def invalidate_race_results(bucket=None):
+    with _race_results_lock:
+        if bucket is None:
+            _race_results_cache.clear()
+            _warm_attempts.clear()
+        else:
+            for cache in (_race_results_cache, _warm_attempts):
+                for key in [key for key in cache if key[0] == bucket]:
+                    del cache[key]
+
+# -------------------------------------------------------------------------------------------
+
+def _race_standings_files(bucket, race_name, league, errors):
+    """
+    {nome file in minuscolo: (nome, etag)} dei file del tag: dal manifest della
+    league se registra le sue classifiche (sha256 come etag), altrimenti dalla
+    lista della cartella.
+    """
+    try:
+        entries = load_bucket_manifest(bucket, race_name, str(league))
+    except Exception as e:
+        print(f"Errore nel manifest per {bucket}/{race_name}: {e}")
+        entries = None
+    if entries:
+        names = [standings_filename(league, sprint) for sprint in (False, True)]
+        if any(name in entries or legacy_filename(name) in entries for name in names):
+            return {name.lower(): (name, entry.get("sha256")) for name, entry in entries.items()}
+
+    files = list_all(bucket, race_name, errors)
+    return {f["name"].lower(): (f["name"], _storage_etag(f)) for f in files if f.get("name")}
+
+def _load_race_standings(bucket, race_name, league):
+    """
+    Lavoro di un thread: trova i file della league (manifest o lista della
+    cartella) e li scarica (None se non ce ne sono).
+    """
+    errors = []
+    by_name = _race_standings_files(bucket, race_name, league, errors)
+
+    def find(sprint):
+        filename = standings_filename(league, sprint)
+        return by_name.get(filename.lower()) or by_name.get(legacy_filename(filename).lower())
+
+    sprint_file = find(True)
+    main_file = find(False)
+    if main_file is None and sprint_file is None:
+        return None, errors
+
+    race_dict = {}
+    for field, item in (("standings", main_file), ("sprint_standings", sprint_file)):
+        if item is None:
+            race_dict[field] = None
+            continue
+        name, etag = item
+        path = f"{race_name}/{name}"
+        try:
+            race_dict[field] = load_storage_object(bucket, path, etag)
+        except Exception as e:
+            errors.append(f"Errore {bucket}/{path}: {e}")
+            race_dict[field] = None
+    return race_dict, errors
 
-    return standings_data
+# -------------------------------------------------------------------------------------------
+
+def iter_standings_from_buckets(user, buckets: List[str] = ["F126", "MGP26"], max_workers: int = STORAGE_WORKERS):
+    """
+    Genera (bucket, race, {"standings", "sprint_standings"}) man mano che le
+    cartelle vengono lette. Liste e download girano su un pool di thread
+    limitato; le cartelle senza file della league vengono saltate. I tag vengono
+    dalla lista della radice (un tag non ancora registrato non sparisce dalle
+    classifiche); i file di ogni tag dal manifest della league, e solo se manca
+    dalla lista della cartella. Gli errori di lista e download
+    vengono scritti nel log e mostrati con st.warning, come nel caricamento
+    sequenziale: uno storage irraggiungibile non passa per "nessuna classifica".
+    """
+    league = user["league"]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        jobs = {}
+        root_errors = {bucket: [] for bucket in buckets}
+        roots = {pool.submit(list_all, bucket, "", root_errors[bucket]): bucket for bucket in buckets}
+        for future in as_completed(roots):
+            bucket = roots[future]
+            for folder in future.result():
+                if not folder.get("name") or folder.get("metadata"):
+                    continue  # i file nella radice hanno metadata, le cartelle no
+                race_name = folder["name"].rstrip("/")
+                if race_name == MANIFEST_DIR:
+                    continue
+                jobs[pool.submit(_load_race_standings, bucket, race_name, league)] = (bucket, race_name)
+        for errors in root_errors.values():
+            for message in errors:
+                print(message)
+                st.warning(message)
+
+        for future in as_completed(jobs):
+            bucket, race_name = jobs[future]
+            race_dict, errors = future.result()
+            for message in errors:
+                print(message)
+                st.warning(message)
+            if race_dict is not None:
+                yield bucket, race_name, race_dict
+
+# -------------------------------------------------------------------------------------------
+
+def load_standings_from_buckets(user, buckets: List[str] = ["F126", "MGP26"]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    standings_data: Dict[str, Dict[str, Dict[str, Any]]] = {bucket: {} for bucket in buckets}
+    for bucket, race_name, race_dict in iter_standings_from_buckets(user, buckets):
+        standings_data[bucket][race_name] = race_dict
+    # ordine delle cartelle come nello storage (le risposte arrivano in ordine sparso)
+    return {bucket: dict(sorted(races.items())) for bucket, races in standings_data.items()}
 
 # -------------------------------------------------------------------------------------------
 
@@ -753,8 +1227,7 @@ def build_points_dict(user, category_data: Any, use_full_name: bool) -> Dict[str
         name, pts = extract_driver_and_points(elem, f1_mode=not use_full_name)
         if not name:
             continue
-        name_norm = normalize_name(name)
-        name_norm = MANUAL_CORRECTIONS.get(name_norm, name_norm)
+        name_norm = canonical_key(name)
         points[name_norm] = points.get(name_norm, 0) + float(pts)
     return points
 
@@ -763,10 +1236,9 @@ def build_points_dict(user, category_data: Any, use_full_name: bool) -> Dict[str
 def build_normalized_team_set(team_drivers: Any, use_full_name: bool) -> set:
     team_drivers_clean = clean_team_drivers(team_drivers)
     if use_full_name:
-        normalized = [normalize_name(d) for d in team_drivers_clean]
+        normalized = [canonical_key(d) for d in team_drivers_clean]
     else:
-        normalized = [normalize_name(d.split()[-1]) for d in team_drivers_clean if isinstance(d, str) and d.strip()]
-    normalized = [MANUAL_CORRECTIONS.get(n, n) for n in normalized]
+        normalized = [canonical_key(d.split()[-1]) for d in team_drivers_clean if isinstance(d, str) and d.strip()]
     return set(normalized)
 
 # -------------------------------------------------------------------------------------------
@@ -838,6 +1310,7 @@ def update_user_field(user, field, label, supabase_client, SUPABASE_SERVICE_ROLE
     except Exception as e:
         st.error(f"DB update exception: {e}")
         return
+    invalidate_tables("teams", "class_new")
 
     # opzionale: aggiorna profiles per coerenza (se richiesto)
     if update_profiles_table:
@@ -995,25 +1468,73 @@ def safe_rgb_to_hex(color):
 
 # -------------------------------------------------------------------------------------------
 
+# -------------------------
+# Cache dell'HTML renderizzato
+# -------------------------
+# Le tabelle vengono costruite come un unico blocco HTML (un solo elemento
+# Streamlit invece di uno per riga) e il risultato resta in una cache LRU di
+# processo indicizzata dall'hash dei dati in ingresso.
+HTML_CACHE_SIZE = 256
+_html_cache = OrderedDict()      # (tipo, hash dei dati) -> html
+_html_cache_lock = threading.Lock()
+
+# -------------------------------------------------------------------------------------------
+
+def _frame_digest(df, *extra):
+    """Hash del contenuto di un DataFrame (valori e colonne) più eventuali parametri."""
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    digest.update(repr((list(df.columns), extra)).encode("utf-8"))
+    return digest.hexdigest()
+
+# -------------------------------------------------------------------------------------------
+
+def _cached_html(key, build):
+    with _html_cache_lock:
+        html = _html_cache.get(key)
+        if html is not None:
+            _html_cache.move_to_end(key)
+            return html
+    html = build()
+    with _html_cache_lock:
+        _html_cache[key] = html
+        _html_cache.move_to_end(key)
+        while len(_html_cache) > HTML_CACHE_SIZE:
+            _html_cache.popitem(last=False)
+    return html
+
+# -------------------------------------------------------------------------------------------
+
+def _html_column(values, escape=False):
+    """Colonna di un DataFrame come Series di stringhe (escape HTML opzionale)."""
+    out = values.astype(str)
+    return out.map(_html.escape) if escape else out
+
+# -------------------------------------------------------------------------------------------
+
 def _render_simple_table_html(rows, spacing_px=None, row_padding=None):
     spacing = 0 if spacing_px is None else spacing_px   # 0 di default (nessun margin-bottom extra)
     padding = '2px 8px' if row_padding is None else row_padding  
+    rows = tuple((str(label), str(value)) for label, value in rows)
+    return _cached_html(
+        ("simple", rows, spacing, padding),
+        lambda: _build_simple_table_html(rows, spacing, padding),
+    )
 
-    rows_html = ""
-    for label, value in rows:
-        label_esc = _html.escape(str(label))
-        value_esc = _html.escape(str(value))
-        rows_html += f"""
+def _build_simple_table_html(rows, spacing, padding):
+    rows_html = "".join(
+        f"""
         <div style='display:flex; justify-content:space-between; align-items:flex-start;
                     padding:{padding}; border-top:1px solid rgba(255,255,255,0.06);'>
             <div style='font-size:13px; font-weight:600; color:#dcdcdc;
                         max-width:65%; white-space:pre-wrap; word-break:break-word;
-                        overflow-wrap:anywhere; line-height:1.2;'>{label_esc}</div>
+                        overflow-wrap:anywhere; line-height:1.2;'>{_html.escape(label)}</div>
             <div style='font-size:14px; font-weight:700; color:#ffffff; text-align:right;
                         max-width:35%; white-space:pre-wrap; word-break:break-word;
-                        overflow-wrap:anywhere; line-height:1.2;'>{value_esc}</div>
+                        overflow-wrap:anywhere; line-height:1.2;'>{_html.escape(value)}</div>
         </div>
         """
+        for label, value in rows
+    )
 
     table_html = f"""
     <div style='width:100%; background:#222; border-radius:8px;
@@ -1029,49 +1550,79 @@ def _render_simple_table_html(rows, spacing_px=None, row_padding=None):
 
 # -------------------------------------------------------------------------------------------
 
+def _team_color_pair(team_info):
+    main_raw = None
+    second_raw = None
+    if team_info:
+        # prova varie chiavi possibili (nel caso la colonna si chiami con nomi diversi)
+        for key in ("main color", "main_color", "mainColor", "mainColorRGB"):
+            if key in team_info:
+                main_raw = parse_color_field(team_info.get(key))
+                break
+        for key in ("second color", "second_color", "secondColor", "accent color"):
+            if key in team_info:
+                second_raw = parse_color_field(team_info.get(key))
+                break
+    color_main = safe_rgb_to_hex(main_raw) if main_raw is not None else safe_rgb_to_hex([0,0,0])
+    color_second = safe_rgb_to_hex(second_raw) if second_raw is not None else safe_rgb_to_hex([100,100,100])
+    return color_main, color_second
+
+# -------------------------------------------------------------------------------------------
+
+STANDINGS_HEADER_HTML = (
+    '<div style="display:flex; font-weight:700; border-bottom:2px solid #ccc; padding-bottom:6px; margin-bottom:8px;">'
+    '<div style="width:30px;">Pos</div>'
+    '<div style="width:30px;"></div>'
+    '<div style="flex-grow:1;">Team</div>'
+    '<div style="width:60px; text-align:right;">Points</div>'
+    '<div style="width:80px; text-align:right;">Penalty</div>'
+    '<div style="width:100px; text-align:right;">Gap (previous)</div>'
+    '<div style="width:80px; text-align:right;">Gap (leader)</div>'
+    '</div>'
+)
+
+def _build_standings_html(df, title):
+    header = (
+        f"<h2 style='color:#ffffff; background-color:#222222; font-size:28px; font-weight:bold; padding: 4px 8px; border-radius:4px;'>{title}</h2>"
+        "<div style='height:10px;'></div>"
+        + STANDINGS_HEADER_HTML
+    )
+    # come la vecchia tabella: senza squadre solo titolo e intestazione
+    if df.empty:
+        return header
+    rows = (
+        '<div style="display:flex; align-items:center; margin-bottom:8px; padding-bottom:4px; border-bottom:1px solid #eee;">'
+        '<div style="width:30px;">' + _html_column(df["Position"]) + '</div>'
+        '<div style="width:20px; height:20px; background-color:' + df["_main"] + '; border: 2px solid ' + df["_second"]
+        + '; border-radius:4px; margin-right:10px;"></div>'
+        '<div style="flex-grow:1;">' + _html_column(df["Team"], escape=True) + '</div>'
+        '<div style="width:60px; text-align:right;">' + _html_column(df["Pts"]) + '</div>'
+        '<div style="width:80px; text-align:right; color:red;">' + _html_column(df["Penalty"]) + '</div>'
+        '<div style="width:100px; text-align:right; color:gray;">' + _html_column(df["Gap from previous"]) + '</div>'
+        '<div style="width:80px; text-align:right; color:#555;">' + _html_column(df["Gap from leader"]) + '</div>'
+        '</div>'
+    )
+    return header + rows.str.cat()
+
 def render_standings_custom(df, teams, title):
-    st.markdown(f"<h2 style='color:#ffffff; background-color:#222222; font-size:28px; font-weight:bold; padding: 4px 8px; border-radius:4px;'>{title}</h2>", unsafe_allow_html=True)
-    st.markdown("<div style='height:10px;'></div>", unsafe_allow_html=True)
-    st.markdown("""
-    <div style="display:flex; font-weight:700; border-bottom:2px solid #ccc; padding-bottom:6px; margin-bottom:8px;">
-        <div style="width:30px;">Pos</div>
-        <div style="width:30px;"></div>
-        <div style="flex-grow:1;">Team</div>
-        <div style="width:60px; text-align:right;">Points</div>
-        <div style="width:80px; text-align:right;">Penalty</div>
-        <div style="width:100px; text-align:right;">Gap (previous)</div>
-        <div style="width:80px; text-align:right;">Gap (leader)</div>
-    </div>
-    """, unsafe_allow_html=True)
-    for _, row in df.iterrows():
-        team_name = row["Team"]
-        team_info = next((t for t in teams if (t.get("name") == team_name) or (t.get("ID") == team_name) or (t.get("id") == team_name)), None)
-        main_raw = None
-        second_raw = None
-        if team_info:
-    # prova varie chiavi possibili (nel caso la colonna si chiami con nomi diversi)
-            for key in ("main color", "main_color", "mainColor", "mainColorRGB"):
-                if key in team_info:
-                    main_raw = parse_color_field(team_info.get(key))
-                    break
-            for key in ("second color", "second_color", "secondColor", "accent color"):
-                if key in team_info:
-                    second_raw = parse_color_field(team_info.get(key))
-                    break
+    """
+    Classifica a squadre come un solo blocco HTML: titolo, intestazione e righe
+    costruite colonna per colonna, in cache sull'hash dei dati.
+    """
+    # primo team che ha il nome della riga come name, ID o id
+    team_index = {}
+    for t in teams:
+        for key in ("name", "ID", "id"):
+            if t.get(key) is not None:
+                team_index.setdefault(t.get(key), t)
+    colors = [_team_color_pair(team_index.get(team_name)) for team_name in df["Team"]]
+    df = df.assign(
+        _main=pd.Series([c[0] for c in colors], index=df.index, dtype=str),
+        _second=pd.Series([c[1] for c in colors], index=df.index, dtype=str),
+    )
 
-        color_main = safe_rgb_to_hex(main_raw) if main_raw is not None else safe_rgb_to_hex([0,0,0])
-        color_second = safe_rgb_to_hex(second_raw) if second_raw is not None else safe_rgb_to_hex([100,100,100])
-        st.markdown(f"""
-        <div style="display:flex; align-items:center; margin-bottom:8px; padding-bottom:4px; border-bottom:1px solid #eee;">
-            <div style="width:30px;">{row['Position']}</div>
-            <div style="width:20px; height:20px; background-color:{color_main}; border: 2px solid {color_second}; border-radius:4px; margin-right:10px;"></div>
-            <div style="flex-grow:1;">{team_name}</div>
-            <div style="width:60px; text-align:right;">{row['Pts']}</div>
-            <div style="width:80px; text-align:right; color:red;">{row['Penalty']}</div>
-            <div style="width:100px; text-align:right; color:gray;">{row['Gap from previous']}</div>
-            <div style="width:80px; text-align:right; color:#555;">{row['Gap from leader']}</div>
-        </div>
-        """, unsafe_allow_html=True)
+    html = _cached_html(("standings", _frame_digest(df, title)), lambda: _build_standings_html(df, title))
+    st.markdown(html, unsafe_allow_html=True)
 
 # -------------------------------------------------------------------------------------------
 
@@ -1213,21 +1764,31 @@ def avg_to_hex(avg):
 
 # -----------------------------------------------------------------------------------------------
 
+RESULTS_HEADER_HTML = (
+    '<div style="display:flex;align-items:center;gap:10px;padding:5px 0;font-weight:600;border-bottom:1px solid #ccc;">'
+    '<div style="width:90px;">Position</div>'
+    '<div style="flex:1;">Pilot</div>'
+    '<div style="width:150px;text-align:left;">Performance score</div>'
+    '<div style="width:80px;text-align:right;">Points</div>'
+    '</div>'
+)
+
+def _build_results_html(df):
+    rows = (
+        '<div style="display:flex;align-items:center;gap:10px;padding:5px 4px;">'
+        '<div style="width:90px;">' + _html_column(df["Position"]) + '</div>'
+        '<div style="flex:1;">' + _html_column(df["Name with Color"]) + '</div>'
+        '<div style="width:150px;">' + _html_column(df["Performance"]) + '</div>'
+        '<div style="width:80px;text-align:right;">' + _html_column(df["Points"]) + '</div>'
+        '</div>'
+    )
+    return RESULTS_HEADER_HTML + rows.str.cat()
+
 def render_table(df):
-    st.markdown("""
-    <div style="display:flex;align-items:center;gap:10px;padding:5px 0;font-weight:600;border-bottom:1px solid #ccc;">
-        <div style="width:90px;">Position</div>
-        <div style="flex:1;">Pilot</div>
-        <div style="width:150px;text-align:left;">Performance score</div>
-        <div style="width:80px;text-align:right;">Points</div>
-    </div>
-    """, unsafe_allow_html=True)
-    for _, row in df.iterrows():
-        st.markdown(f"""
-        <div style="display:flex;align-items:center;gap:10px;padding:5px 4px;">
-            <div style="width:90px;">{row['Position']}</div>
-            <div style="flex:1;">{row['Name with Color']}</div>
-            <div style="width:150px;">{row['Performance']}</div>
-            <div style="width:80px;text-align:right;">{row['Points']}</div>
-        </div>
-        """, unsafe_allow_html=True)
+    """
+    Risultati di una sessione come un solo blocco HTML (un elemento Streamlit
+    invece di uno per pilota), costruito colonna per colonna e in cache
+    sull'hash del DataFrame. "Name with Color" è già HTML (format_name).
+    """
+    html = _cached_html(("results", _frame_digest(df)), lambda: _build_results_html(df))
+    st.markdown(html, unsafe_allow_html=True)
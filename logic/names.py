@@ -0,0 +1,126 @@
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+
+# Normalizzazione dei nomi dei piloti, senza dipendenze da streamlit/supabase.
+# Le stesse poche centinaia di nomi passano di continuo da format_name,
+# get_color, build_points_dict, show_racer_screen e dagli scorer: ogni funzione
+# è memoizzata (cache LRU limitata) e lavora solo sulle stringhe; gli altri tipi
+# seguono il comportamento originale senza passare dalla cache.
+# canonical_key è l'unica chiave per confrontare due nomi: la usano indici dei
+# colori, punti per pilota, voti (scorer e scheda pilota) e team FPK dei piloti.
+# Sono re-esportate da logic.functions.
+
+NAME_CACHE_SIZE = 4096
+
+# -------------------------
+# Correzioni manuali globali
+# -------------------------
+MANUAL_CORRECTIONS = {
+    "ferman aldeguer": "fermin aldeguer",
+    "maverick viaales": "maverick vinales",
+    "jorge martan": "jorge martin",
+    "raaol fernandez": "raul fernandez",
+}
+
+_NON_ALPHA_SPACE = re.compile(r"[^a-z\s]")
+_SPACES = re.compile(r"\s+")
+
+# -------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def _normalize_fullname_for_keys(name):
+    s = unicodedata.normalize("NFC", name).strip()
+    if "," in s:
+        parts = [p.strip() for p in s.split(",") if p.strip()]
+        if len(parts) >= 2:
+            s = parts[1] + " " + parts[0]
+        else:
+            s = parts[0]
+    s = _SPACES.sub(" ", s)
+    return unicodedata.normalize("NFC", s)
+
+def normalize_fullname_for_keys(name):
+    """"Cognome, Nome" -> "Nome Cognome", spazi compattati, NFC."""
+    if not isinstance(name, str):
+        return ""
+    return _normalize_fullname_for_keys(name)
+
+# -------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def _normalize_name(name):
+    name = name.strip().lower()
+    name = unicodedata.normalize('NFKD', name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    name = _NON_ALPHA_SPACE.sub("", name)
+    return _SPACES.sub(" ", name).strip()
+
+def normalize_name(name):
+    """Nome minuscolo senza accenti, solo lettere e spazi singoli."""
+    if not name:
+        return ""
+    return _normalize_name(str(name))
+
+# -------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def _fix_mojibake(s):
+    s_nfc = unicodedata.normalize("NFC", s)
+    if "Ã" in s_nfc or "Â" in s_nfc:
+        try:
+            repaired = s_nfc.encode("latin-1").decode("utf-8")
+            return unicodedata.normalize("NFC", repaired)
+        except Exception:
+            return s_nfc
+    return s_nfc
+
+def fix_mojibake(s):
+    """Ripara il testo UTF-8 letto come latin-1 ("MÃ¡rquez" -> "Márquez")."""
+    if not isinstance(s, str):
+        return s
+    return _fix_mojibake(s)
+
+# -------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def _canonical_key(name):
+    key = _normalize_name(_normalize_fullname_for_keys(_fix_mojibake(name)))
+    return sys.intern(MANUAL_CORRECTIONS.get(key, key))
+
+def canonical_key(name):
+    """
+    Chiave canonica di un pilota: fix_mojibake, "Cognome, Nome" -> "Nome Cognome",
+    normalize_name e MANUAL_CORRECTIONS. La stringa è internata, quindi la
+    stessa chiave è sempre lo stesso oggetto.
+    """
+    if not name:
+        return ""
+    return _canonical_key(str(name))
+
+# -------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def pilot_color_keys(fullname, cat_norm):
+    """
+    Chiavi di pilot_colors per un nome: (chiave principale, chiave cognome, cognome).
+    In MotoGP la chiave principale è il nome completo, in F1 il cognome.
+    """
+    parsed_name = normalize_fullname_for_keys(fullname)
+    parts = parsed_name.split()
+    surname = parts[-1] if parts else parsed_name
+    key_surname = canonical_key(surname)
+    key = canonical_key(parsed_name) if cat_norm == "motogp" else key_surname
+    return key, key_surname, surname
+
+# -------------------------------------------------------------------------------------------
+
+def clear_name_caches():
+    for fn in (_normalize_fullname_for_keys, _normalize_name, _fix_mojibake,
+               _canonical_key, pilot_color_keys):
+        fn.cache_clear()
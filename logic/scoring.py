@@ -0,0 +1,437 @@
+import ast
+import hashlib
+import json
+import numpy as np
+from logic.names import canonical_key
+
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+
+# Modulo senza dipendenze da streamlit/supabase: lo usano sia raceweek_computer
+# sia gli script offline in computation/.
+
+# -------------------------
+# Layout delle regole
+# -------------------------
+# Le righe di rules_* si distinguono solo per il nome della regola e gli scorer le
+# leggevano per posizione dopo .order("rule"). Ogni layout elenca, nell'ordine
+# in cui il database restituisce le regole della league modello (da cui
+# select_league copia le regole di ogni nuova league) con .order("rule"), cioè
+# secondo la collation del database e non un ordinamento Python, il nome logico
+# usato dagli scorer (None = regola non usata nel calcolo). Il layout serve solo
+# a ricavare una volta la mappa {nome della regola: nome logico}: il piano di
+# ogni league è costruito per nome, quindi una regola aggiunta dall'editor non
+# sposta le altre.
+# I layout "_legacy" sono quelli delle vecchie tabelle rules_f1 / rules_mgp lette
+# dagli script offline, che fanno da modello a se stesse nell'ordine in cui le
+# ha restituite la select (come il vecchio calcolo).
+RULES_TEMPLATE_LEAGUE = "Fantamotori"
+
+RULE_LAYOUTS = {
+    "F1": (
+        "teammate_quali",       # colonna 4 della matrice risultati
+        "fastest_pit",          # colonna 11
+        "driver_of_the_day",    # colonna 10
+        "fastest_lap",          # colonna 8
+        "gp_points",            # Grand Prix points distribution
+        "overtake_max_pos",
+        "pit_record",           # colonna 12
+        None,
+        "overtake",             # punti per posizione guadagnata (colonna 6)
+        "pole",                 # colonna 2
+        "q2",
+        "q3",
+        "quali_record",         # colonna 3
+        "race_record",          # colonna 9
+        "sprint_marks",         # voti sprint per posizione d'arrivo
+        "sprint_points",        # Sprint Race points distribution
+        "teammate_race",        # colonna 5
+    ),
+    "MGP": (
+        "teammate_quali",
+        "fastest_lap",          # colonna 8
+        "gp_points",
+        "overtake_max_pos",
+        None,
+        "overtake",
+        "pole",
+        "q2",
+        "quali_record",
+        "race_record",          # colonna 10
+        "extra_bonus",          # colonna 11 della matrice Grand Prix
+        "sprint_marks",
+        "sprint_points",
+        "top_speed",            # colonna 9
+        "teammate_race",
+    ),
+    "F1_legacy": (
+        "teammate_quali",
+        "fastest_pit",
+        "driver_of_the_day",
+        "fastest_lap",
+        None,
+        "overtake_max_pos",
+        "pit_record",
+        None,
+        "overtake",
+        "pole",
+        "q2",
+        "q3",
+        "quali_record",
+        "race_record",
+        None,
+        "teammate_race",
+    ),
+    "MGP_legacy": (
+        "teammate_quali",
+        "fastest_lap",
+        None,
+        "overtake_max_pos",
+        None,
+        "overtake",
+        "pole",
+        "q2",
+        "quali_record",
+        "race_record",
+        None,
+        "top_speed",
+        "teammate_race",
+    ),
+}
+
+# nomi noti usati per verificare che le posizioni corrispondano davvero al layout
+RULE_ANCHORS = {
+    "gp_points": "grand prix points distribution",
+    "sprint_points": "sprint race points distribution",
+}
+
+LIST_RULES = {"gp_points", "sprint_points", "sprint_marks"}
+
+# pesi che dipendono dal layout: nel Grand Prix MotoGP la colonna 3 valeva la
+# regola del record in gara in raceweek_computer e quella del record in
+# qualifica negli script offline
+RULE_ALIASES = {
+    "F1": {},
+    "MGP": {"gp_record_flag": "race_record"},
+    "F1_legacy": {},
+    "MGP_legacy": {"gp_record_flag": "quali_record"},
+}
+
+# le tabelle legacy non hanno i voti sprint: gli script offline usavano 6..1
+DEFAULT_SPRINT_MARKS = (6, 5, 4, 3, 2, 1)
+
+# -------------------------
+# Colonne della matrice risultati
+# -------------------------
+# Riga pilota: [ID, Q1/Q2/Q3, flag..., posizioni guadagnate (6), posizione (7), flag...].
+# Per ogni sessione: (indice di colonna, regola) dei bonus booleani.
+_BASE_FLAGS = ((2, "pole"), (3, "quali_record"), (4, "teammate_quali"), (5, "teammate_race"))
+
+SESSION_FLAGS = {
+    ("F1", "Sprint race"): _BASE_FLAGS,
+    ("F1", "Grand Prix"): _BASE_FLAGS + (
+        (8, "fastest_lap"),
+        (9, "race_record"),
+        (10, "driver_of_the_day"),
+        (11, "fastest_pit"),
+        (12, "pit_record"),
+    ),
+    ("MGP", "Sprint race"): _BASE_FLAGS + ((8, "fastest_lap"), (9, "top_speed")),
+    ("MGP", "Grand Prix"): (
+        (2, "pole"),
+        (3, "gp_record_flag"),
+        (4, "teammate_quali"),
+        (5, "teammate_race"),
+        (8, "fastest_lap"),
+        (9, "top_speed"),
+        (10, "race_record"),
+        (11, "extra_bonus"),
+    ),
+}
+
+# bonus legati alla sessione di qualifica raggiunta (colonna 1)
+QUALI_FLAGS = {
+    "F1": (("Q2", "q2"), ("Q3", "q3")),
+    "MGP": (("Q2", "q2"),),
+}
+
+NOT_CLASSIFIED = 99
+DNF_PERF = -99
+
+_RULE_PLAN_CACHE = {}
+_RULE_PLAN_CACHE_SIZE = 64
+_RULE_NAMES_CACHE = {}
+
+# -------------------------------------------------------------------------------------------
+
+def _rule_number(v):
+    n = float(v)
+    return int(n) if n.is_integer() else n
+
+# -------------------------------------------------------------------------------------------
+
+def _parse_rule_list(raw):
+    if isinstance(raw, (list, tuple)):
+        values = raw
+    else:
+        s = str(raw).strip()
+        try:
+            values = json.loads(s)
+        except Exception:
+            values = ast.literal_eval(s)
+    return tuple(_rule_number(v) for v in values)
+
+# -------------------------------------------------------------------------------------------
+
+def rules_version(rows):
+    """Hash stabile delle coppie (rule, value): cambia solo se cambiano le regole."""
+    payload = sorted((str(r.get("rule")), json.dumps(r.get("value"), sort_keys=True, default=str)) for r in rows)
+    return hashlib.sha1(json.dumps(payload).encode("utf-8")).hexdigest()
+
+# -------------------------------------------------------------------------------------------
+
+def _rule_name(row):
+    return str(row.get("rule") or "").strip().casefold()
+
+# -------------------------------------------------------------------------------------------
+
+def rule_names(template_rows, layout):
+    """
+    {nome della regola (casefold): nome logico} dalle righe della league modello,
+    abbinate al layout nell'ordine in cui arrivano dal database (.order("rule"):
+    riordinarle in Python potrebbe non seguire la collation e spostare i pesi).
+    Solleva ValueError se il modello non corrisponde al layout. In cache per
+    sequenza dei nomi del modello.
+    """
+    ordered = list(template_rows)
+    key = (layout, tuple(_rule_name(row) for row in ordered))
+    names = _RULE_NAMES_CACHE.get(key)
+    if names is not None:
+        return names
+
+    slots = RULE_LAYOUTS[layout]
+    if len(ordered) != len(slots):
+        raise ValueError(
+            f"Rules layout '{layout}' expects {len(slots)} template rules, found {len(ordered)}."
+        )
+
+    names = {}
+    for slot, row in zip(slots, ordered):
+        if slot is None:
+            continue
+        name = _rule_name(row)
+        anchor = RULE_ANCHORS.get(slot)
+        if anchor and name != anchor:
+            raise ValueError(
+                f"Rules layout '{layout}': expected '{anchor}' for {slot}, found '{row.get('rule')}'."
+            )
+        names[name] = slot
+
+    if len(_RULE_NAMES_CACHE) >= _RULE_PLAN_CACHE_SIZE:
+        _RULE_NAMES_CACHE.clear()
+    _RULE_NAMES_CACHE[key] = names
+    return names
+
+# -------------------------------------------------------------------------------------------
+
+def compile_rule_plan(rows, layout, names=None):
+    """
+    Converte le righe di rules_* in un dict {nome logico: valore tipizzato}:
+    float per i bonus, tuple per le distribuzioni di punti/voti. Le righe sono
+    riconosciute per nome (names, di default ricavati dalle righe stesse); le
+    regole sconosciute sono ignorate. Solleva ValueError se manca una regola.
+    """
+    if names is None:
+        names = rule_names(rows, layout)
+
+    plan = {}
+    for row in rows:
+        slot = names.get(_rule_name(row))
+        if slot is None or slot in plan:
+            continue
+        value = row.get("value")
+        plan[slot] = _parse_rule_list(value) if slot in LIST_RULES else float(value)
+
+    missing = sorted(name for name, slot in names.items() if slot not in plan)
+    if missing:
+        raise ValueError(f"Rules layout '{layout}': missing rules {', '.join(missing)}.")
+
+    for alias, slot in RULE_ALIASES[layout].items():
+        plan[alias] = plan[slot]
+    plan.setdefault("sprint_marks", DEFAULT_SPRINT_MARKS)
+    return plan
+
+# -------------------------------------------------------------------------------------------
+
+def rule_plan(league, rows, layout, template_rows=None):
+    """
+    Piano delle regole compilato, in cache per (layout, league, versione delle
+    regole). I nomi vengono dalle regole della league modello (template_rows);
+    senza modello le righe fanno da modello a se stesse.
+    """
+    if template_rows is None:
+        template_rows = rows
+    names = rule_names(template_rows, layout)
+    key = (layout, league, rules_version(rows), rules_version(template_rows))
+    plan = _RULE_PLAN_CACHE.get(key)
+    if plan is None:
+        if len(_RULE_PLAN_CACHE) >= _RULE_PLAN_CACHE_SIZE:
+            _RULE_PLAN_CACHE.clear()
+        plan = compile_rule_plan(rows, layout, names)
+        _RULE_PLAN_CACHE[key] = plan
+    return plan
+
+# -------------------------------------------------------------------------------------------
+# Motore di calcolo vettoriale
+# -------------------------------------------------------------------------------------------
+
+def _flag_columns(cat, session):
+    quali = tuple((f"quali_{label}", label, slot) for label, slot in QUALI_FLAGS[cat])
+    flags = tuple((f"flag_{col}", col, slot) for col, slot in SESSION_FLAGS[(cat, session)])
+    return quali, flags
+
+# -------------------------------------------------------------------------------------------
+
+def _to_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+# -------------------------------------------------------------------------------------------
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+# -------------------------------------------------------------------------------------------
+
+def load_result_matrix(rows, cat, session):
+    """
+    Carica le righe della matrice risultati (liste di lunghezza variabile) in un
+    array strutturato NumPy con una colonna per ogni flag usato dalla sessione.
+    """
+    quali, flags = _flag_columns(cat, session)
+    dtype = [
+        ("name", object),
+        ("pos", np.int64),          # posizione, 99 se non classificato
+        ("pos_value", np.float64),  # posizione come float, NaN se non numerica
+        ("gained", np.float64),     # posizioni guadagnate, NaN se non intere
+    ]
+    dtype += [(field, np.bool_) for field, _, _ in quali + flags]
+
+    data = np.zeros(len(rows), dtype=dtype)
+    for i, driver in enumerate(rows):
+        data["name"][i] = driver[0]
+        data["pos"][i] = _to_int(driver[7], NOT_CLASSIFIED)
+        data["pos_value"][i] = _to_float(driver[7])
+        gained = _to_int(driver[6], None)
+        data["gained"][i] = np.nan if gained is None else gained
+        for field, label, _ in quali:
+            data[field][i] = label in driver[1]
+        for field, col, _ in flags:
+            data[field][i] = len(driver) > col and bool(driver[col])
+    return data
+
+# -------------------------------------------------------------------------------------------
+
+def build_marks_index(marks, tag):
+    """
+    Indicizza una volta le righe di marks_*_new per chiave canonica del pilota
+    (logic/names.py): {"keys": {chiave: voto grezzo del tag}, "rows": [(ID, voto)]}.
+    Se due righe hanno la stessa chiave vale la prima; le righe restano per il
+    confronto per sottostringa del vecchio calcolo.
+    """
+    keys = {}
+    rows = []
+    for mark in marks:
+        mark_id = mark.get("ID")
+        if mark_id is None:
+            continue
+        rows.append((str(mark_id), mark.get(tag)))
+        keys.setdefault(canonical_key(mark_id), mark.get(tag))
+    return {"keys": keys, "rows": rows}
+
+# -------------------------------------------------------------------------------------------
+
+def find_mark(marks_index, driver_id):
+    """
+    Voto grezzo di un pilota: prima per chiave canonica, poi come il vecchio
+    calcolo (primo ID di marks che contiene l'ID del pilota). Il risultato del
+    confronto per sottostringa viene salvato nelle chiavi. None se manca.
+    """
+    key = canonical_key(driver_id)
+    keys = marks_index["keys"]
+    if key in keys:
+        return keys[key]
+    driver_id = str(driver_id)
+    for mark_id, value in marks_index["rows"]:
+        if driver_id in mark_id:
+            keys[key] = value
+            return value
+    return None
+
+# -------------------------------------------------------------------------------------------
+
+def marks_points(rows, marks_index):
+    """Voto del tag per ogni pilota: 6 d'ufficio se classificato senza voto, altrimenti -99."""
+    points = []
+    for driver in rows:
+        try:
+            points.append(float(find_mark(marks_index, driver[0])))
+        except (TypeError, ValueError):
+            points.append(6 if _to_int(driver[7], None) is not None else DNF_PERF)
+    return points
+
+# -------------------------------------------------------------------------------------------
+
+def score_session(rows, plan, cat, session, points=None):
+    """
+    Calcola [ID, POS, POINTS, TOT, PERF] per ogni pilota della sessione e li
+    ritorna ordinati per (-PERF, POS). Se points è None i punti base sono i voti
+    sprint per posizione del piano regole.
+    """
+    if not rows:
+        return []
+
+    data = load_result_matrix(rows, cat, session)
+    quali, flags = _flag_columns(cat, session)
+    fields = [field for field, _, _ in quali + flags]
+    weights = np.array([plan.get(slot, 0.0) for _, _, slot in quali + flags], dtype=np.float64)
+
+    matrix = np.column_stack([data[field] for field in fields]).astype(np.float64)
+    tot = matrix @ weights
+
+    gained = data["gained"]
+    overtake = (gained < 0) | ((gained >= 0) & (data["pos_value"] <= plan["overtake_max_pos"]))
+    tot += np.where(overtake, gained, 0.0) * plan["overtake"]
+
+    pos = data["pos"]
+    if points is None:
+        marks = plan["sprint_marks"]
+        points = [marks[p - 1] if 1 <= p <= len(marks) else 0 for p in pos.tolist()]
+    values = np.asarray(points, dtype=np.float64)
+
+    perf = values + tot
+    perf[pos == NOT_CLASSIFIED] = DNF_PERF
+
+    # stessi tipi del vecchio calcolo: TOT resta l'intero 0 se nessun bonus si
+    # applica, POINTS/PERF restano interi se lo sono voti e bonus
+    bonus = matrix.any(axis=1) | (overtake & ~np.isnan(gained))
+
+    def number(value, as_float):
+        return float(value) if as_float else int(value)
+
+    rows_out = []
+    for i in np.lexsort((pos, -perf)):
+        point = points[i]
+        tot_i = number(tot[i], bonus[i])
+        if pos[i] == NOT_CLASSIFIED:
+            perf_i = DNF_PERF
+        else:
+            perf_i = number(perf[i], isinstance(point, float) or isinstance(tot_i, float))
+        rows_out.append([data["name"][i], int(pos[i]), point, tot_i, perf_i])
+    return rows_out
@@ -0,0 +1,117 @@
+import pandas as pd
+
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+
+# Modulo senza dipendenze da streamlit/supabase: calcoli sulle classifiche a
+# squadre usati da raceweek_computer e dalla schermata standings.
+
+# -------------------------
+# Tabella materializzata league_standings
+# -------------------------
+# Una riga per (league, id) con il totale grezzo (senza penalità) di ogni serie.
+# Schema e trigger che la allineano a points_per_race_* in sql/league_standings.sql;
+# raceweek_computer e build_team la ricostruiscono dopo le proprie scritture.
+STANDINGS_TABLE = "league_standings"
+
+# colonne di points_per_race_* che non sono punti di un tag
+EXCLUDED_POINTS_KEYS = {"id", "prim_key", "league"}
+
+# -------------------------------------------------------------------------------------------
+
+def race_points_total(row):
+    """Somma dei punti di tutti i tag di una riga points_per_race_*."""
+    return sum(
+        value
+        for key, value in row.items()
+        if key not in EXCLUDED_POINTS_KEYS
+        and isinstance(value, (int, float))
+    )
+
+# -------------------------------------------------------------------------------------------
+
+def standings_from_points(league, points_f1, points_mgp):
+    """
+    Righe di league_standings ricalcolate da zero dalle righe points_per_race_*
+    della league: {id: {"league", "id", "f1", "mgp"}}.
+    """
+    rows = {}
+    for column, points in (("f1", points_f1), ("mgp", points_mgp)):
+        for element in points:
+            if element.get("league") != league or not element.get("id"):
+                continue
+            row = rows.setdefault(
+                element["id"],
+                {"league": league, "id": element["id"], "f1": 0.0, "mgp": 0.0},
+            )
+            row[column] = float(race_points_total(element))
+    return rows
+
+# -------------------------------------------------------------------------------------------
+# Tabelle della schermata standings
+# -------------------------------------------------------------------------------------------
+
+STANDINGS_OUTPUT_COLUMNS = ["Position", "Team", "Pts", "Penalty", "Gap from previous", "Gap from leader"]
+
+# -------------------------------------------------------------------------------------------
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+# -------------------------------------------------------------------------------------------
+
+def _rank_table(rows):
+    """
+    Righe (team, punti, penalità) ordinate per punti, con posizione e distacchi
+    (dal precedente e dal leader), come DataFrame.
+    """
+    ranked = sorted(rows, key=lambda row: -row[1])
+    out = []
+    previous = leader = ranked[0][1] if ranked else 0
+    for position, (team, pts, penalty) in enumerate(ranked, start=1):
+        out.append((position, team, pts, penalty, max(previous - pts, 0), leader - pts))
+        previous = pts
+    return pd.DataFrame(out, columns=STANDINGS_OUTPUT_COLUMNS)
+
+# -------------------------------------------------------------------------------------------
+
+def build_standings_tables(teams, league, league_standings, penalties, penalty_points_f1, penalty_points_mgp):
+    """
+    Classifiche F1, MotoGP e combinata della league come tre DataFrame.
+    teams, totali (league_standings: {id: {"f1", "mgp"}}) e penalità (penalty_new)
+    sono uniti con dict indicizzati per UUID del team, quindi il costo è lineare
+    nel numero di team. I punti mostrati includono la penalità (numero di
+    ritardi × punti della regola "Penalty points for late call-ups").
+    """
+    names = {
+        team["UUID"]: team.get("name")
+        for team in teams
+        if team.get("league") == league and team.get("UUID")
+    }
+    penalty_index = {
+        item["uuid"]: item
+        for item in penalties
+        if item.get("league") == league and item.get("uuid")
+    }
+    league_standings = league_standings or {}
+
+    f1_rows, mgp_rows, combined_rows = [], [], []
+    for team_id, name in names.items():
+        team = name if name is not None else team_id
+        standing = league_standings.get(team_id) or {}
+        penalty = penalty_index.get(team_id) or {}
+
+        pen_f1 = _number(penalty.get("penalty_f1")) * penalty_points_f1
+        pen_mgp = _number(penalty.get("penalty_mgp")) * penalty_points_mgp
+        pts_f1 = _number(standing.get("f1")) + pen_f1
+        pts_mgp = _number(standing.get("mgp")) + pen_mgp
+
+        f1_rows.append((team, int(pts_f1), int(pen_f1)))
+        mgp_rows.append((team, int(pts_mgp), int(pen_mgp)))
+        combined_rows.append((team, int(pts_f1 + pts_mgp), int(pen_f1 + pen_mgp)))
+
+    return _rank_table(f1_rows), _rank_table(mgp_rows), _rank_table(combined_rows)
@@ -0,0 +1,112 @@
+import math
+import re
+import unicodedata
+from functools import lru_cache
+
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+# -------------------------------------------------------------------------------------------
+
+# Misura del testo per dimensionare gli iframe di components.html senza browser:
+# larghezze dei glifi precalcolate e a capo "greedy" come quello del browser,
+# con risultati memoizzati per (testo, larghezza).
+# Le tabelle usano lo stack Inter, system-ui, ..., Arial: le larghezze sono quelle
+# di Arial/Helvetica (metriche compatibili, in millesimi di em); il grassetto
+# (600/700) è leggermente più largo, Inter un po' più del regolare.
+
+TEXT_CACHE_SIZE = 8192
+LINE_HEIGHT_EM = 1.2        # line-height delle celle di _render_simple_table_html
+BOLD_SCALE = 1.07
+DEFAULT_GLYPH = 556         # larghezza media di una lettera minuscola / cifra
+
+GLYPH_WIDTHS = {
+    " ": 278, "!": 278, '"': 355, "#": 556, "$": 556, "%": 889, "&": 667, "'": 191,
+    "(": 333, ")": 333, "*": 389, "+": 584, ",": 278, "-": 333, ".": 278, "/": 278,
+    "0": 556, "1": 556, "2": 556, "3": 556, "4": 556, "5": 556, "6": 556, "7": 556,
+    "8": 556, "9": 556, ":": 278, ";": 278, "<": 584, "=": 584, ">": 584, "?": 556,
+    "@": 1015, "A": 667, "B": 667, "C": 722, "D": 722, "E": 667, "F": 611, "G": 778,
+    "H": 722, "I": 278, "J": 500, "K": 667, "L": 556, "M": 833, "N": 722, "O": 778,
+    "P": 667, "Q": 778, "R": 722, "S": 667, "T": 611, "U": 722, "V": 667, "W": 944,
+    "X": 667, "Y": 667, "Z": 611, "[": 278, "\\": 278, "]": 278, "^": 469, "_": 556,
+    "`": 333, "a": 556, "b": 556, "c": 500, "d": 556, "e": 556, "f": 278, "g": 556,
+    "h": 556, "i": 222, "j": 222, "k": 500, "l": 222, "m": 833, "n": 556, "o": 556,
+    "p": 556, "q": 556, "r": 333, "s": 500, "t": 278, "u": 556, "v": 500, "w": 722,
+    "x": 500, "y": 500, "z": 500, "{": 334, "|": 260, "}": 334, "~": 584,
+    "–": 556, "—": 1000, "’": 222, "“": 333, "”": 333, "•": 350, "…": 1000, "€": 556,
+    "°": 400, "×": 584,
+}
+
+_SPACES = re.compile(r"\s+")
+
+# -------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=1024)
+def glyph_width(char):
+    """Larghezza di un carattere in millesimi di em; le lettere accentate usano la lettera base."""
+    width = GLYPH_WIDTHS.get(char)
+    if width is not None:
+        return width
+    base = unicodedata.normalize("NFKD", char)[:1]
+    width = GLYPH_WIDTHS.get(base)
+    if width is not None:
+        return width
+    # ideogrammi ed emoji occupano circa un em
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return 1000
+    return DEFAULT_GLYPH
+
+# -------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def text_width(text, font_px, bold=False):
+    """Larghezza in px di una riga di testo."""
+    units = sum(glyph_width(c) for c in text)
+    return units * font_px / 1000.0 * (BOLD_SCALE if bold else 1.0)
+
+# -------------------------------------------------------------------------------------------
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def wrapped_lines(text, width_px, font_px, bold=False):
+    """
+    Righe occupate da text in una colonna larga width_px: a capo sugli spazi,
+    le parole più lunghe della colonna vanno spezzate (overflow-wrap:anywhere).
+    Le righe esplicite (\\n, white-space:pre-wrap) sono contate separatamente.
+    """
+    width_px = max(1.0, float(width_px))
+    space = text_width(" ", font_px, bold)
+    total = 0
+    for paragraph in str(text).split("\n"):
+        words = _SPACES.sub(" ", paragraph.strip()).split(" ")
+        lines = 1
+        cur = 0.0
+        for word in words:
+            if not word:
+                continue
+            w = text_width(word, font_px, bold)
+            if w > width_px:
+                # parola spezzata: riempie righe intere e lascia il resto sull'ultima
+                if cur > 0:
+                    lines += 1
+                full, rest = divmod(w, width_px)
+                lines += int(full) - (1 if rest == 0 else 0)
+                cur = rest if rest else width_px
+                continue
+            needed = w if cur == 0 else cur + space + w
+            if needed > width_px:
+                lines += 1
+                cur = w
+            else:
+                cur = needed
+        total += lines
+    return max(1, total)
+
+# -------------------------------------------------------------------------------------------
+
+def line_height(font_px):
+    return math.ceil(font_px * LINE_HEIGHT_EM)
+
+# -------------------------------------------------------------------------------------------
+
+def clear_text_caches():
+    for fn in (glyph_width, text_width, wrapped_lines):
+        fn.cache_clear()
@@ -1,20 +1,20 @@
 import streamlit as st
-from datetime import datetime, timedelta
+from datetime import datetime
 from supabase import create_client
 from logic.functions import (
     normalize_category,
     render_badges,
     fix_mojibake,
-    results_exist,
-    sprint_pole,
-    get_results,
+    probe_results,
+    race_results,
+    warm_race_results,
     format_name,
-    build_pilot_colors,
+    pilot_colors_for_league,
     render_table,
+    calendar_model,
 )
+from logic.calendar import raceweek_indexes, display_order, race_status
 import pandas as pd
-import pickle
-import io
 import numpy as np
 
 # -------------------------------------------------------------------------------------------
@@ -29,83 +29,27 @@ supabase = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
 # --------------------- CALENDAR SCREEN ----------------------------------------------------
 
 def calendar_screen(user):
-    races_f1 = supabase.from_("championship_f1_new").select("*").execute().data or []
-    races_mgp = supabase.from_("championship_mgp_new").select("*").execute().data or []
-
-    all_races = []
-    for race in races_f1:
-        race["category"] = "F1"
-        all_races.append(race)
-    for race in races_mgp:
-        race["category"] = "MGP"
-        all_races.append(race)
-
-    for race in all_races:
-        race["name"] = fix_mojibake(race.get("name", race.get("ID", "Unknown Race")))
-        race["circuit"] = fix_mojibake(race.get("circuit", "Circuit unknown"))
-        race["when_dt"] = datetime.strptime(race["when"], "%Y-%m-%d")
-
-    # ordina tutte le gare cronologicamente
-    all_races.sort(key=lambda r: r["when_dt"])
-
-    # raggruppa per raceweek e assegna il numero RW
-    raceweeks = []
-    current_date = None
-    current_rw = []
-    for race in all_races:
-        if race["when_dt"] != current_date:
-            if current_rw:
-                raceweeks.append(current_rw)
-            current_rw = [race]
-            current_date = race["when_dt"]
-        else:
-            current_rw.append(race)
-    if current_rw:
-        raceweeks.append(current_rw)
-
-    # assegna numero originale di raceweek (partendo da 1)
-    for idx, rw in enumerate(raceweeks, start=1):
-        for r in rw:
-            r["_rw_number"] = idx
+    # gare parsate e raggruppate per raceweek una volta per processo (logic/calendar.py)
+    model = calendar_model()
+    raceweeks = model["raceweeks"]
 
     # identifica gara appena conclusa e prossima gara
     today = datetime.now().date()
-    past_rw_idx = None
-    next_rw_idx = None
-    for idx, rw in enumerate(raceweeks):
-        rw_date = rw[0]["when_dt"].date()
-        if rw_date <= today:
-            past_rw_idx = idx
-        elif rw_date > today and next_rw_idx is None:
-            next_rw_idx = idx
-
-    # costruisci ordine di visualizzazione (prima la gara appena conclusa e la prossima, poi tutte le altre)
-    display_order = []
-    seen = set()
+    past_rw_idx, next_rw_idx = raceweek_indexes(model, today)
+
+    # la raceweek appena conclusa è quella che si apre di più: risultati scaricati in background
     if past_rw_idx is not None:
-        display_order.append(raceweeks[past_rw_idx])
-        seen.add(past_rw_idx)
-    if next_rw_idx is not None and next_rw_idx not in seen:
-        display_order.append(raceweeks[next_rw_idx])
-        seen.add(next_rw_idx)
-    for idx, rw in enumerate(raceweeks):
-        if idx not in seen:
-            display_order.append(rw)
+        warm_race_results(raceweeks[past_rw_idx], user)
+
+    # ordine di visualizzazione: prima la gara appena conclusa e la prossima, poi tutte le altre
+    ordered = display_order(raceweeks, past_rw_idx, next_rw_idx)
 
     st.title("Race Calendar")
 
     # render dei raceweeks
-    for rw in display_order:
+    for rw in ordered:
         rw_number = rw[0].get("_rw_number", "?")
-        race_date = rw[0]["when_dt"].date()
-        if race_date < today:
-            rw_status = "| ✅ Completed"
-        elif today <= race_date <= today + timedelta(days=2):
-            rw_status = "| 🔄 Undergoing"
-        elif today + timedelta(days=2) < race_date <= today + timedelta(days=7):
-            rw_status = "| 📅 Upcoming"
-        else:
-            rw_status = ""
+        rw_status = race_status(rw[0]["when_dt"].date(), today)
 
         with st.container():
             st.markdown(f"""
@@ -120,15 +64,7 @@ def calendar_screen(user):
                 category = race["category"]
                 race_id = race.get("ID", f"{category}_{race['when']}")
 
-                race_day = race["when_dt"].date()
-                if race_day < today:
-                    status_text = "| ✅ Completed"
-                elif today <= race_day <= today + timedelta(days=2):
-                    status_text = "| 🔄 Undergoing"
-                elif today + timedelta(days=2) < race_day <= today + timedelta(days=7):
-                    status_text = "| 📅 Upcoming"
-                else:
-                    status_text = ""
+                status_text = race_status(race["when_dt"].date(), today)
 
                 cols = st.columns([0.85, 0.15])
                 with cols[0]:
@@ -140,13 +76,18 @@ def calendar_screen(user):
                     if st.button("Results", key=f"results_{race_id}_{category}"):
                         with st.spinner("Checking results availability..."):
                             try:
-                                available = results_exist(race, race.get("tag"), user)
+                                available, race_data = probe_results(race, race.get("tag"), user)
                             except Exception as e:
-                                available = False
+                                available, race_data = None, None
                                 st.error(f"Errore nel controllo risultati: {e}")
-                        if not available:
+                        if available is False:
                             st.warning("Results are not available yet!")
-                        else:
+                        elif available:
+                            # se il controllo ha già scaricato la classifica la passa alla schermata dei risultati
+                            st.session_state.prefetched_results = {
+                                "key": (category, race.get("tag"), user["league"]),
+                                "data": race_data,
+                            }
                             st.session_state.selected_race = race
                             st.session_state.screen = "race_results"
                             st.rerun()
@@ -166,8 +107,7 @@ def race_results_screen(user, race):
     st.header(f"[{race.get('category')}] {race.get('ID')} | Results")
 
     race_tag = race.get("tag")
-    teams = supabase.from_("teams").select("*").execute().data or []
-    pilot_colors = build_pilot_colors(teams)
+    pilot_colors = pilot_colors_for_league(user["league"])
 
     def get_df(data, category):
         if not data:
@@ -179,17 +119,17 @@ def race_results_screen(user, race):
         df["Name with Color"] = df["Name"].apply(lambda n: format_name(n, pilot_colors, category))
         return df
 
-    def get_all(race_tag_local, category_local, file="result_matrix.pkl"):
-        try:
-            data_bytes = supabase.storage.from_(category_local).download(f"{race_tag_local}/{file}")
-            return pickle.load(io.BytesIO(data_bytes))
-        except Exception:
-            return None
+    # classifiche, poleman e result_matrix in parallelo, dalla cache se già scaricati
+    prefetched = st.session_state.get("prefetched_results") or {}
+    race_data = None
+    if prefetched.get("key") == (race["category"], race_tag, user["league"]):
+        race_data = prefetched.get("data")
+    results = race_results(race, user, race_data)
 
     if race.get("sprint"):
-        sprint_data = get_results(race_tag, race["category"], True, user)
-        pole = sprint_pole(race_tag, race["category"])
-        if "F1" in race["category"]:
+        sprint_data = results["sprint"]
+        pole = results["pole"]
+        if "F1" in race["category"] and pole:
             pole = pole[:-3]
         if sprint_data:
             sprint_data = [[np.nan if x == -99 else x for x in row] for row in sprint_data]
@@ -202,7 +142,7 @@ def race_results_screen(user, race):
         else:
             st.info("No sprint data available.")
 
-    race_data = get_results(race_tag, race["category"], False, user)
+    race_data = results["race"]
     if race_data:
         race_data = [[np.nan if x == -99 else x for x in row] for row in race_data]
         st.subheader("🏁 Race Results")
@@ -211,7 +151,7 @@ def race_results_screen(user, race):
     else:
         st.info("No race data available.")
 
-    alldata = get_all(race_tag, race["category"])
+    alldata = results["matrix"]
 
     cat_norm = normalize_category(race.get("category") or "")
     if cat_norm == "f1":
@@ -4,7 +4,7 @@ from supabase import create_client
 import streamlit as st
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
-from logic.functions import normalize_riders
+from logic.functions import normalize_riders, invalidate_tables
 
 # -------------------------------------------------------------------------------------------
 # --------------------- SUPABASE CLIENT --------------------------------------
@@ -254,10 +254,11 @@ def callup_screen(user):
             unsafe_allow_html=True,
         )
 
-        st.markdown('<div class="racers-container">', unsafe_allow_html=True)
+        # contenitore, titolo, intestazione e righe vanno in un solo blocco HTML (un elemento invece di uno per team)
+        parts = ['<div class="racers-container">']
 
         if caption:
-            st.markdown(f"<h4 style='margin:6px 0 10px 0;color:#fff;font-weight:700'>{_html.escape(caption)}</h4>", unsafe_allow_html=True)
+            parts.append(f"<h4 style='margin:6px 0 10px 0;color:#fff;font-weight:700'>{_html.escape(caption)}</h4>")
 
         # build header columns dynamically
         header_cols_html = f'<div class="header-row"><div class="h-col" style="flex:6">Team</div>'
@@ -268,7 +269,7 @@ def callup_screen(user):
         for i in range(R):
             header_cols_html += f'<div class="h-col" style="flex:2">{labels_res[i]}</div>'
         header_cols_html += '<div class="h-col" style="flex:1; text-align:right; min-width:140px">Date</div></div>'
-        st.markdown(header_cols_html, unsafe_allow_html=True)
+        parts.append(header_cols_html)
 
         # prefetch teams by uuid for this league
         teams_by_uuid = {}
@@ -343,9 +344,10 @@ def callup_screen(user):
             row_html += f'<div class="col-date">{_html.escape(date_str)}</div>'
             row_html += '</div>'
 
-            st.markdown(row_html, unsafe_allow_html=True)
+            parts.append(row_html)
 
-        st.markdown('</div>', unsafe_allow_html=True)
+        parts.append('</div>')
+        st.markdown("".join(parts), unsafe_allow_html=True)
 
     def ensure_calls_row(table_name, user_uuid, league_id=None):
         """
@@ -364,6 +366,7 @@ def callup_screen(user):
             if league_id:
                 base["league"] = league_id
             ins = supabase.from_(table_name).insert([base]).execute()
+            invalidate_tables(table_name)
             if getattr(ins, "error", None):
                 return base
             return (ins.data or [base])[0]
@@ -709,6 +712,7 @@ def callup_screen(user):
                             st.success("Call-up saved (insert).")
                     else:
                         st.success("Call-up updated successfully.")
+                    invalidate_tables(calls_new_table)
                 except Exception as e:
                     st.error(f"Exception while saving call-up: {e}")
 
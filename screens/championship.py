@@ -1,11 +1,11 @@
 import streamlit as st
 import ast
-import pickle
 import pandas as pd
-import io
+import time
 from datetime import datetime
 import json
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import streamlit.components.v1 as components
 from supabase import create_client
 from logic.functions import (
@@ -13,7 +13,17 @@ from logic.functions import (
     safe_load_team_list,
     _render_pilot_buttons,
     _render_simple_table_html,
-    safe_rgb_to_hex
+    safe_rgb_to_hex,
+    rebuild_league_standings,
+    invalidate_tables,
+    load_bucket_manifest,
+    invalidate_manifest,
+)
+from logic.scoring import rule_plan, score_session, build_marks_index, marks_points, RULES_TEMPLATE_LEAGUE
+from logic.standings import STANDINGS_TABLE
+from logic.artifacts import (
+    standings_filename, legacy_filename, update_manifest, dumps_artifact, decode_artifact, RESULT_MATRIX,
+    RESULTS_SCOPE,
 )
 
 # -------------------------------------------------------------------------------------------
@@ -93,19 +103,22 @@ def show_rules_screen(rules_list, screen_name):
         </div>
         """
 
-        est_height, needs_scroll = _estimate_rows_height(rows,
+        est_height, _ = _estimate_rows_height(rows,
                                                          container_width_px=900,
-                                                         left_pct=0.70,
-                                                         right_pct=0.30,
-                                                         avg_char_px=7.0,
-                                                         line_height_px=18,
-                                                         vertical_padding_px=28,
+                                                         left_pct=0.65,
+                                                         right_pct=0.35,
+                                                         # intestazione "Rules", padding del contenitore e margini del body
+                                                         vertical_padding_px=56,
                                                          min_h=90,
                                                          max_h=8000,
-                                                         safety_mul=1.15,
-                                                         per_row_padding_px=1)
+                                                         safety_mul=1.05,
+                                                         per_row_padding_px=5,    # padding 2px sopra e sotto + bordo
+                                                         row_padding_x_px=8)
 
-        components.html(container_html, height=est_height, scrolling=needs_scroll)
+        # la stima usa 900px di larghezza: sui telefoni il testo va a capo di più e il
+        # frame risulterebbe tagliato, quindi lo scroll resta sempre disponibile
+        # (come i frame di show_racers)
+        components.html(container_html, height=est_height, scrolling=True)
 
     # pulsanti in basso: Go back sempre; Change rules solo per il presidente
     cols = st.columns([1, 1])
@@ -158,7 +171,11 @@ def check_storage_folder(category: str, race_id: str):
 
         tag = resp.data["tag"]
 
-        # Lista contenuto cartella
+        # Se build_manifest.py ha registrato i risultati caricati la cartella ha file
+        if load_bucket_manifest(bucket_name, tag, RESULTS_SCOPE):
+            return False, tag, None
+
+        # Manifest mancante = non so: lista contenuto cartella
         files = (
             supabase
             .storage
@@ -274,6 +291,280 @@ def compute_results_menu(league_id: str):
                 # la funzione ha già mostrato lo warning; puoi aggiungere un messaggio aggiuntivo o log se vuoi
                 st.info("No results computed.")
 
+STATS_FIELDS = ("convocations", "sub", "dnf", "wins", "podiums")
+STATS_GENERATED_COLUMNS = ("uuid",)
+
+def write_league_stats(cat, league, tag, raced, calls, race_final):
+    """
+    Aggiorna convocations/sub/dnf/wins/podiums di league_*_stats per il tag:
+    una select con in_() su tutti i piloti coinvolti, calcolo in memoria e un
+    solo upsert su (player_id, league_id) (vincolo in sql/upsert_keys.sql).
+    Le righe lette sono intere e vengono rispedite intere (senza l'uuid
+    generato dal database), così l'upsert non perde colonne NOT NULL.
+    """
+    table = "league_mgp_stats" if cat == "MGP" else "league_f1_stats"
+    tag = f"{tag}{str(datetime.now().year)[2:]}"
+
+    finished = [driver[0] for driver in race_final]
+    finished_set = set(finished)
+
+    additions = {field: set() for field in STATS_FIELDS}
+    for call in calls:
+        for key in ("first", "second", "third", "fourth"):
+            pid = call.get(key)
+            if pid is None:
+                continue
+            additions["convocations"].add(pid)
+            if pid not in finished_set:
+                additions["dnf"].add(pid)
+        for key in ("reserve", "reserve_two", "reserve_three", "reserve_four"):
+            pid = call.get(key)
+            if pid is not None and pid in finished_set:
+                additions["sub"].add(pid)
+    additions["podiums"].update(finished[:3])
+    additions["wins"].update(finished[:1])
+
+    # i piloti in gara perdono il tag da tutte le liste prima di essere ricalcolati
+    cancelled = {pid for pid in raced if pid is not None}
+    player_ids = set(cancelled)
+    for ids in additions.values():
+        player_ids |= ids
+    if not player_ids:
+        return
+
+    response = (
+        supabase
+        .table(table)
+        .select("*")
+        .eq("league_id", league)
+        .in_("player_id", sorted(player_ids))
+        .execute()
+        )
+
+    rows = []
+    for row in response.data or []:
+        pid = row.get("player_id")
+        changed = False
+        for field in STATS_FIELDS:
+            tags = list(row.get(field) or [])
+            if pid in cancelled or pid in additions[field]:
+                if tag in tags:
+                    tags = [t for t in tags if t != tag]
+                    changed = True
+                if pid in additions[field]:
+                    tags.append(tag)
+                    changed = True
+            row[field] = tags
+        if changed:
+            rows.append({k: v for k, v in row.items() if k not in STATS_GENERATED_COLUMNS})
+
+    if rows:
+        (
+            supabase
+            .table(table)
+            .upsert(rows, on_conflict="player_id,league_id")
+            .execute()
+            )
+
+# -------------------------------------------------------------------------------------------
+
+def publish_standings_artifacts(bucket_name, tag, league, sprint_final, race_final):
+    """
+    Serializza una sola volta le classifiche filtrate della league e carica
+    sprint_standings_{league}.npz e standings_{league}.npz (formato colonnare)
+    in parallelo.
+    Ritorna {nome file: bytes} per il manifest della league.
+    """
+    files = {}
+    for filename, data in (
+        (standings_filename(league, sprint=True), sprint_final),
+        (standings_filename(league), race_final),
+    ):
+        files[filename] = dumps_artifact(data)
+    artifacts = {f"{tag}/{filename}": data for filename, data in files.items()}
+
+    def upload(storage_path, file_bytes):
+        return supabase.storage.from_(bucket_name).upload(
+            storage_path,
+            file_bytes,
+            file_options={
+                "content-type": "application/octet-stream",
+                "upsert": "true"
+            }
+        )
+
+    with ThreadPoolExecutor(max_workers=len(artifacts)) as pool:
+        futures = [pool.submit(upload, path, data) for path, data in artifacts.items()]
+        # result() rilancia l'eventuale errore di upload
+        for future in futures:
+            future.result()
+
+    return files
+
+# -------------------------------------------------------------------------------------------
+
+def score_teams(teams, cat, league, sprint_final, race_final):
+    """
+    Ritorna {team UUID: punti del tag} per i team della league. Le classifiche
+    filtrate vengono indicizzate per ID pilota una sola volta (colonna 5 =
+    punti assegnati), così ogni pilota costa un lookup.
+    """
+    sprint_index = {driver[0]: driver[5] for driver in sprint_final}
+    race_index = {driver[0]: driver[5] for driver in race_final}
+    team_column = "F1" if cat == "F1" else "MotoGP"
+
+    totals = {}
+    for team in teams:
+        if team["league"] != league:
+            continue
+        tot = 0
+        for pilot in safe_load_team_list(team[team_column]):
+            tot += sprint_index.get(pilot, 0) + race_index.get(pilot, 0)
+        totals[team["UUID"]] = tot
+    return totals
+
+# -------------------------------------------------------------------------------------------
+
+# colonne generate dal database, mai rispedite negli upsert
+POINTS_GENERATED_COLUMNS = ("prim_key",)
+
+def publish_race_points(cat, league, tag, team_totals, existing, attempts=3):
+    """
+    Scrive in points_per_race_* il totale del tag per i team della league con
+    un solo upsert su (league, id) (vincolo in sql/upsert_keys.sql). Come il
+    vecchio update() riga per riga, solo i team che hanno già una riga
+    (existing: {team UUID: riga completa}) vengono scritti, e ogni riga viene
+    rispedita intera con il tag aggiornato: anche se finisse in un insert non
+    mancherebbe nessuna colonna NOT NULL. L'upsert è una singola transazione:
+    o vengono aggiornati tutti i team o nessuno, e in caso di errore si ritenta.
+    Ritorna {team UUID: punti} dei team effettivamente scritti.
+    """
+    table = "points_per_race_mgp" if cat == "MGP" else "points_per_race_f1"
+    published = {team_id: tot for team_id, tot in team_totals.items() if team_id in existing}
+    rows = []
+    for team_id, tot in published.items():
+        row = {k: v for k, v in existing[team_id].items() if k not in POINTS_GENERATED_COLUMNS}
+        row.update({"league": league, "id": team_id, tag: float(tot)})
+        rows.append(row)
+    if not rows:
+        return published
+
+    for attempt in range(1, attempts + 1):
+        try:
+            (
+                supabase
+                .table(table)
+                .upsert(rows, on_conflict="league,id")
+                .execute()
+                )
+            return published
+        except Exception:
+            if attempt == attempts:
+                raise
+            time.sleep(0.5 * 2 ** (attempt - 1))
+
+# -------------------------------------------------------------------------------------------
+
+RACEWEEK_TABLES = {
+    "F1": {
+        "marks": "marks_f1_new",
+        "rules": "rules_f1_new",
+        "calls": "calls_f1_hist",
+        "points": "points_per_race_f1",
+        "team_column": "F1",
+    },
+    "MGP": {
+        "marks": "marks_mgp_new",
+        "rules": "rules_mgp_new",
+        "calls": "calls_mgp_hist",
+        "points": "points_per_race_mgp",
+        "team_column": "MotoGP",
+    },
+}
+
+CALLS_COLUMNS = (
+    "uuid", "first", "second", "third", "fourth",
+    "reserve", "reserve_two", "reserve_three", "reserve_four",
+)
+
+def fetch_raceweek_inputs(bucket_name, cat, tag, league):
+    """
+    Scarica result_matrix.npz (o il vecchio .pkl) e le righe che servono al calcolo del tag:
+    voti (ID + colonna del tag), regole (della league e della league modello),
+    convocazioni, team e punti già pubblicati per il tag della sola league.
+    Le richieste sono indipendenti e partono in parallelo; la prima che
+    fallisce rilancia l'errore.
+    """
+    tables = RACEWEEK_TABLES[cat]
+
+    def download_results():
+        storage = supabase.storage.from_(bucket_name)
+        for filename in (RESULT_MATRIX, legacy_filename(RESULT_MATRIX)):
+            try:
+                return storage.download(f"{tag}/{filename}")
+            except Exception:
+                continue
+        # file mancante: lo gestisce il chiamante come "Results not available"
+        return None
+
+    def fetch_marks():
+        return supabase.table(tables["marks"]).select(f"ID,{tag}").execute().data or []
+
+    def fetch_rules():
+        # anche le regole della league modello: danno i nomi delle regole del piano
+        return (
+            supabase.table(tables["rules"])
+            .select("rule,value,league")
+            .in_("league", sorted({league, RULES_TEMPLATE_LEAGUE}))
+            .order("rule", desc=False)
+            .execute()
+            .data or []
+        )
+
+    def fetch_calls():
+        return (
+            supabase.table(tables["calls"])
+            .select(",".join(CALLS_COLUMNS))
+            .eq("tag", tag)
+            .eq("league", league)
+            .execute()
+            .data or []
+        )
+
+    def fetch_teams():
+        return (
+            supabase.table("teams")
+            .select(f"UUID,league,{tables['team_column']}")
+            .eq("league", league)
+            .execute()
+            .data or []
+        )
+
+    def fetch_previous_points():
+        # righe intere: publish_race_points le rispedisce con il tag aggiornato
+        rows = (
+            supabase.table(tables["points"])
+            .select("*")
+            .eq("league", league)
+            .execute()
+            .data or []
+        )
+        return {row["id"]: row for row in rows}
+
+    jobs = {
+        "results": download_results,
+        "marks": fetch_marks,
+        "rules": fetch_rules,
+        "calls": fetch_calls,
+        "teams": fetch_teams,
+        "previous_points": fetch_previous_points,
+    }
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = {name: pool.submit(job) for name, job in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+# -------------------------------------------------------------------------------------------
+
 def raceweek_computer(tag, cat, league):
 
     if cat == "MotoGP":
@@ -297,102 +588,43 @@ def raceweek_computer(tag, cat, league):
     bucket_name = bucket_map[cat]
 
     # -----------------------
-    # Download result_matrix.pkl
+    # Fetch result_matrix + tabelle (in parallelo, solo league/tag richiesti)
     # -----------------------
 
-    file_path = f"{tag}/result_matrix.pkl"
-
     try:
-        file_bytes = supabase.storage.from_(bucket_name).download(file_path)
-
-        # File non trovato o vuoto
-        if not file_bytes:
-            st.warning("Results not available!")
-            return False
+        inputs = fetch_raceweek_inputs(bucket_name, cat, tag, league)
+    except Exception as e:
+        st.error(f"Error fetching tables: {e}")
+        return
 
-        results = pickle.loads(file_bytes)
+    file_bytes = inputs["results"]
 
-    except Exception:
+    # File non trovato o vuoto
+    if not file_bytes:
         st.warning("Results not available!")
         return False   # ← RITORNO esplicito: niente calcolo fatto
 
-    # -----------------------
-    # Table mapping
-    # -----------------------
-
-    table_map = {
-        "F1": {
-            "marks": "marks_f1_new",
-            "rules": "rules_f1_new",
-            "calls": "calls_f1_hist"
-        },
-        "MGP": {
-            "marks": "marks_mgp_new",
-            "rules": "rules_mgp_new",
-            "calls": "calls_mgp_hist"
-        }
-    }
-
-    marks_table = table_map[cat]["marks"]
-    rules_table = table_map[cat]["rules"]
-    calls_table = table_map[cat]["calls"]
-
-    # -----------------------
-    # Fetch tables
-    # -----------------------
-
     try:
-        marks_response = supabase.table(marks_table).select("*").execute()
-        rules_response = (
-            supabase.table(rules_table)
-            .select("*")
-            .order("rule", desc=False)
-            .execute()
-        )
-        calls_response = supabase.table(calls_table).select("*").execute()
-        starter_number_response = supabase.table("leagues").select("*").execute()
-    except Exception as e:
-        st.error(f"Error fetching tables: {e}")
-        return
+        results = decode_artifact(file_bytes)
+    except Exception:
+        st.warning("Results not available!")
+        return False
 
-    marks = marks_response.data or []
-    rules = [item for item in (rules_response.data or []) if item["league"] == league]
-    calls = [
-        item for item in (calls_response.data or [])
-        if item["tag"] == tag and item["league"] == league
-    ]
-    starter_number = [
-        item for item in (starter_number_response.data or [])
-        if item["ID"] == league
-    ]
+    marks_index = build_marks_index(inputs["marks"], tag)
+    rules = [row for row in inputs["rules"] if row.get("league") == league]
+    template_rules = [row for row in inputs["rules"] if row.get("league") == RULES_TEMPLATE_LEAGUE]
+    try:
+        plan = rule_plan(league, rules, cat, template_rules)
+    except ValueError as e:
+        st.error(f"Rules not valid for this league: {e}")
+        return False
+    calls = inputs["calls"]
+    teams = inputs["teams"]
 
     # -----------------------
     # Functions
     # -----------------------
     
-    def assign_points(drivers, prules, index=0, points=None):
-            if points is None:
-                points = []
-
-    
-            if index >= len(drivers):
-                return points
-
-            driver = drivers[index]
-            try:
-                pos = int(driver[7])
-                if 1 <= pos <= len(prules):
-                    points.append(prules[pos - 1])
-                else:
-                    points.append(0)  
-            except (ValueError, IndexError):
-                points.append(0)
-                
-    
-            return assign_points(drivers, prules, index + 1, points)
-        
-    # -------------------------------------------------------------------------
-    
     def build_filtered_final(final_results, calls_dict):
         filtered_final = []
     
@@ -433,445 +665,20 @@ def raceweek_computer(tag, cat, league):
 
         return filtered_final
     
-    # -------------------------------------------------------------------------    
-    
-    def update_record_lists(player_id, category, league, tag):
-        if player_id is None: 
-            return
-        table = "league_mgp_stats" if category == "MGP" else "league_f1_stats"
-        tag = tag + str(datetime.now().year)[2:]
-        response = (
-            supabase
-            .table(table)
-            .select("convocations")
-            .eq("player_id", player_id)
-            .eq("league_id", league)
-            .single()
-            .execute()
-            )
-
-        if not response.data:
-            return  
-
-        tags = response.data.get("convocations") or []
-
- 
-        if tag in tags:
-            tags.remove(tag)
-
- 
-        tags.append(tag)
-
- 
-        (
-            supabase
-            .table(table)
-            .update({"convocations": tags})
-            .eq("player_id", player_id)
-            .eq("league_id", league)
-            .execute()
-            )
-    
-    # -------------------------------------------------------------------------
-        
-    def update_sub_lists(player_id, category, league, tag):
-        if player_id is None: 
-            return
-        table = "league_mgp_stats" if category == "MGP" else "league_f1_stats"
-        tag = tag + str(datetime.now().year)[2:]
-        response = (
-            supabase
-            .table(table)
-            .select("sub")
-            .eq("player_id", player_id)
-            .eq("league_id", league)
-            .single()
-            .execute()
-            )
-
-        if not response.data:
-            return  
-
-        tags = response.data.get("sub") or []
-
- 
-        if tag in tags:
-            tags.remove(tag)
-
- 
-        tags.append(tag)
-
- 
-        (
-            supabase
-            .table(table)
-            .update({"sub": tags})
-            .eq("player_id", player_id)
-            .eq("league_id", league)
-            .execute()
-            )
-    
-    # -------------------------------------------------------------------------
-    
-    def update_dnf(player_id, category, league, tag):
-        if player_id is None:
-            return
-
-        table = "league_mgp_stats" if category == "MGP" else "league_f1_stats"
-        tag = f"{tag}{str(datetime.now().year)[2:]}"
-
-        res = (
-            supabase
-            .table(table)
-            .select("dnf")
-            .eq("player_id", player_id)
-            .eq("league_id", league)
-            .single()
-            .execute()
-            )
-
-        if not res.data:
-            return
-
-        tags = res.data.get("dnf") or []
-
-        if tag in tags:
-            tags.remove(tag)
-
-        tags.append(tag)
-        
-        (
-            supabase
-            .table(table)
-            .update({"dnf": tags})
-            .eq("player_id", player_id)
-            .eq("league_id", league)
-            .execute()
-            )
-    
-    # -------------------------------------------------------------------------
-        
-    def update_podiums(player_id, category, league, tag):
-        if player_id is None:
-            return
-
-        table = "league_mgp_stats" if category == "MGP" else "league_f1_stats"
-        tag = f"{tag}{str(datetime.now().year)[2:]}"
-
-        res = (
-            supabase
-            .table(table)
-            .select("podiums")
-            .eq("player_id", player_id)
-            .eq("league_id", league)
-            .single()
-            .execute()
-            )
-
-        if not res.data:
-            return
-
-        tags = res.data.get("podiums") or []
-
-        if tag in tags:
-            tags.remove(tag)
-
-        tags.append(tag)
-        
-        (
-            supabase
-            .table(table)
-            .update({"podiums": tags})
-            .eq("player_id", player_id)
-            .eq("league_id", league)
-            .execute()
-            )
-    
-    # -------------------------------------------------------------------------
-        
-    def update_wins(player_id, category, league, tag):
-        if player_id is None:
-            return
-
-        table = "league_mgp_stats" if category == "MGP" else "league_f1_stats"
-        tag = f"{tag}{str(datetime.now().year)[2:]}"
-
-        res = (
-            supabase
-            .table(table)
-            .select("wins")
-            .eq("player_id", player_id)
-            .eq("league_id", league)
-            .single()
-            .execute()
-            )
-
-        if not res.data:
-            return
-
-        tags = res.data.get("wins") or []
-
-        if tag in tags:
-            tags.remove(tag)
-
-        tags.append(tag)
-        
-        (
-            supabase
-            .table(table)
-            .update({"wins": tags})
-            .eq("player_id", player_id)
-            .eq("league_id", league)
-            .execute()
-            )
-    
-    # -------------------------------------------------------------------------
-
-    def cancel_this_tag(player_id, cat, league, tag):
-        table = "league_mgp_stats" if cat == "MGP" else "league_f1_stats"
-        tag = f"{tag}{str(datetime.now().year)[2:]}"
-
-        res = (
-            supabase
-            .table(table)
-            .select("convocations, sub, dnf, wins, podiums")
-            .eq("player_id", player_id)
-            .eq("league_id", league)
-            .single()
-            .execute()
-            )
-        
-        if not res.data:
-            return
-
-        updates = {}
-
-        for field in ("convocations", "sub", "dnf", "wins", "podiums"):
-            tags = res.data.get(field) or []
-            if tag in tags:
-                tags.remove(tag)
-                updates[field] = tags
-
-        if updates:
-            (
-                supabase
-                .table(table)
-                .update(updates)
-                .eq("player_id", player_id)
-                .eq("league_id", league)
-                .execute()
-                )
-            
-            
     # -------------------------
-    # ------ SPRINT RACE
+    # ------ SPRINT RACE / MAIN RACE
     # -------------------------
-    
-    
-    SPRINT_FINAL = []
-    if results.get('Sprint race'):
-        sprint_points = []
-        for driver in results['Sprint race']:
-            sprint_points.append(driver[0])
-        
-        POS = []
-        for driver in results['Sprint race']:
-            try:
-                POS.append(int(driver[7]))
-            except:
-                POS.append(99)
-                      
-        POINTS = []
-        if cat == "F1":
-            prules = ast.literal_eval(rules[14]["value"])
-            POINTS = assign_points(results['Sprint race'], prules)
-        
-        if cat == "MGP":
-            prules = ast.literal_eval(rules[11]["value"])
-            POINTS = assign_points(results['Sprint race'], prules)
-       
-        TOT = []
-        
-        if cat == "F1":
-            for driver in results['Sprint race']:
-                tot = 0
-                if 'Q2' in driver[1]:
-                    tot += float(rules[10].get("value"))
-                if 'Q3' in driver[1]:
-                    tot += float(rules[11].get("value"))
-                if driver[2]:
-                    tot += float(rules[9].get("value"))
-                if driver[3]:
-                    tot += float(rules[12].get("value"))
-                if driver[4]:
-                    tot += float(rules[0].get("value"))
-                if driver[5]:
-                    tot += float(rules[16].get("value"))
-                try:
-                    if float(driver[6]) < 0:
-                        tot += int(driver[6]) * float(rules[8].get("value"))
-                except:
-                    tot += 0
-                try:
-                    if float(driver[6]) >= 0 and float(driver[7]) <= float(rules[5].get("value")):
-                        tot += int(driver[6]) * float(rules[8].get("value"))
-                except:
-                    tot += 0
-                TOT.append(tot)
-                
-        if cat == "MGP":
-            for driver in results['Sprint race']:
-                tot = 0
-                if 'Q2' in driver[1]:
-                    tot += float(rules[7].get("value"))
-                if driver[2]:
-                    tot += float(rules[6].get("value"))
-                if driver[3]:
-                    tot += float(rules[8].get("value"))
-                if driver[4]:
-                    tot += float(rules[0].get("value"))
-                if driver[5]:
-                    tot += float(rules[14].get("value"))
-                try:
-                    if float(driver[6]) < 0:
-                        tot += int(driver[6]) * float(rules[5].get("value"))
-                except:
-                    tot += 0
-                try:
-                    if float(driver[6]) >= 0 and float(driver[7]) <= float(rules[3].get("value")):
-                        tot += int(driver[6]) * float(rules[5].get("value"))
-                except:
-                    tot += 0
-                if driver[8]:
-                    tot += float(rules[1].get("value"))
-                if driver[9]:
-                    tot += float(rules[13].get("value"))
-                TOT.append(tot)
-            
-        PERF = [x + y for x, y in zip(POINTS, TOT)]
-        
-        FINAL = [[a, b, c, d, e] for [a, b, c, d, e] in zip(sprint_points, POS, POINTS, TOT, PERF)]
 
-        for driver in FINAL:
-            if int(driver[1]) == 99:
-                driver[4] = -99        
-        SPRINT_FINAL = sorted(FINAL, key=lambda row: (-row[-1], row[1]))
-            
-        
-        
-    # ------ MAIN RACE ----------------------------------------------------------
+    SPRINT_FINAL = score_session(results.get('Sprint race') or [], plan, cat, "Sprint race")
 
-    points = []
-    for driver in results['Grand Prix']:
-        points.append(driver[0])
-        
-    POS = []
-    for driver in results['Grand Prix']:
-        try:
-                POS.append(int(driver[7]))
-        except:
-                POS.append(99)
-        
-    POINTS = []
-    for driver in results['Grand Prix']:
-        for mark in marks:
-            if driver[0] in mark.get('ID'):
-                try:
-                    POINTS.append(float(mark.get(tag)))
-                except:
-                    try:
-                        check = int(driver[7])
-                        POINTS.append(6)
-                    except:
-                        POINTS.append(-99)
-    
-    TOT = []
-     
-    if cat == "F1":
-        for driver in results['Grand Prix']:
-            tot = 0
-            if 'Q2' in driver[1]:
-                tot += float(rules[10].get("value"))
-            if 'Q3' in driver[1]:
-                tot += float(rules[11].get("value"))
-            if driver[2]:
-                tot += float(rules[9].get("value"))
-            if driver[3]:
-                tot += float(rules[12].get("value"))
-            if driver[4]:
-                tot += float(rules[0].get("value"))
-            if driver[5]:
-                tot += float(rules[16].get("value"))
-            try:
-                if float(driver[6]) < 0:
-                    tot += int(driver[6]) * float(rules[8].get("value"))
-            except:
-                tot += 0
-            try:
-                if float(driver[6]) >= 0 and float(driver[7]) <= float(rules[5].get("value")):
-                    tot += int(driver[6]) * float(rules[8].get("value"))
-            except:
-                tot += 0
-            if driver[8]:
-                tot += float(rules[3].get("value"))
-            if driver[9]:
-                tot += float(rules[13].get("value"))
-            if driver[10]:
-                tot += float(rules[2].get("value"))
-            if driver[11]:
-                tot += float(rules[1].get("value"))
-
-            if driver[12]:
-                tot += float(rules[6].get("value"))
-            TOT.append(tot)
-            
-        PERF = [x + y for x, y in zip(POINTS, TOT)]
-        
-        
-    if cat == "MGP":
-        for driver in results['Grand Prix']:
-            tot = 0
-            if 'Q2' in driver[1]:
-                tot += float(rules[7].get("value"))
-            if driver[2]:
-                tot += float(rules[6].get("value"))
-            if driver[3]:
-                tot += float(rules[9].get("value"))
-            if driver[4]:
-                tot += float(rules[0].get("value"))
-            if driver[5]:
-                tot += float(rules[14].get("value"))
-            try:
-                if float(driver[6]) < 0:
-                    tot += int(driver[6]) * float(rules[5].get("value"))
-            except:
-                tot += 0
-            try:
-                if float(driver[6]) >= 0 and float(driver[7]) <= float(rules[3].get("value")):
-                    tot += int(driver[6]) * float(rules[5].get("value"))
-            except:
-                tot += 0
-            if driver[8]:
-                tot += float(rules[1].get("value"))
-            if driver[9]:
-                tot += float(rules[13].get("value"))
-            if driver[10]:
-                tot += float(rules[9].get("value"))
-            if driver[11]:
-                tot += float(rules[10].get("value"))
-            TOT.append(tot)
-            
-        PERF = [x + y for x, y in zip(POINTS, TOT)]
-
-    FINAL = [[a, b, c, d, e] for [a, b, c, d, e] in zip(points, POS, POINTS, TOT, PERF)]
-
-    for driver in FINAL:
-            if int(driver[1]) == 99:
-                driver[4] = -99
-
-    RACE_FINAL = sorted(FINAL, key=lambda row: (-row[-1], row[1]))
+    RACE_FINAL = score_session(
+        results['Grand Prix'],
+        plan,
+        cat,
+        "Grand Prix",
+        points=marks_points(results['Grand Prix'], marks_index),
+    )
 
-    
     calls_dict = {}
 
     for row in calls:
@@ -896,13 +703,8 @@ def raceweek_computer(tag, cat, league):
     
     FILTERED_RACE_FINAL = build_filtered_final(RACE_FINAL, calls_dict)
     
-    if cat == "F1":
-        sprint_race_points = ast.literal_eval(rules[15]["value"])
-        race_points = ast.literal_eval(rules[4]["value"])
-    
-    if cat == "MGP":
-        sprint_race_points = ast.literal_eval(rules[12]["value"])
-        race_points = ast.literal_eval(rules[2]["value"])
+    sprint_race_points = list(plan["sprint_points"])
+    race_points = list(plan["gp_points"])
 
     while len(sprint_race_points) < len(FILTERED_SPRINT_FINAL):
         sprint_race_points.append(0)
@@ -915,125 +717,45 @@ def raceweek_computer(tag, cat, league):
 
     for i, racer in enumerate(FILTERED_RACE_FINAL):
         racer.append(race_points[i])
-    
-
-
-
-    for racer in results["Grand Prix"]:
-        cancel_this_tag(racer[0], cat, league, tag)
-        
-    for racer in calls:
-        update_record_lists(racer["first"], cat, league, tag)
-        update_record_lists(racer["second"], cat, league, tag)
-        update_record_lists(racer["third"], cat, league, tag)
-        update_record_lists(racer["fourth"], cat, league, tag)
-        for driver in FILTERED_RACE_FINAL:
-            if racer["reserve"] == driver[0]:
-                update_sub_lists(racer["reserve"], cat, league, tag)
-            if racer["reserve_two"] == driver[0]:
-                update_sub_lists(racer["reserve"], cat, league, tag)
-            if racer["reserve_three"] == driver[0]:
-                update_sub_lists(racer["reserve"], cat, league, tag)
-            if racer["reserve_four"] == driver[0]:
-                update_sub_lists(racer["reserve"], cat, league, tag)
-                
-    finished_drivers = {driver[0] for driver in FILTERED_RACE_FINAL}
-    for racer in calls:
-        for key in ("first", "second", "third", "fourth"):
-            pid = racer.get(key)
 
-            if pid is None:
-                continue
+    team_totals = score_teams(teams, cat, league, FILTERED_SPRINT_FINAL, FILTERED_RACE_FINAL)
 
-            if pid not in finished_drivers:
-                update_dnf(pid, cat, league, tag)
-    
-    update_podiums(FILTERED_RACE_FINAL[0][0], cat, league, tag)
-    update_podiums(FILTERED_RACE_FINAL[1][0], cat, league, tag)
-    update_podiums(FILTERED_RACE_FINAL[2][0], cat, league, tag)
-    update_wins(FILTERED_RACE_FINAL[0][0], cat, league, tag)
-            
-    teams = supabase.table("teams").select("*").execute()
-    teams = teams.data
-    
-    if cat == "F1":
-        table = "points_per_race_f1"
-        points = supabase.table(table).select("*").execute()
-        points = points.data
-    elif cat == "MGP":
-        table = "points_per_race_mgp"
-        points = supabase.table(table).select("*").execute()
-        points = points.data
-        
-    for team in teams:
-        if team["league"] == league:
-            tot = 0           
-            if cat == "F1":
-                pilots = ast.literal_eval(team["F1"])
-            elif cat == "MGP":
-                pilots =  ast.literal_eval(team["MotoGP"])
-            for pilot in pilots:
-                for driver in FILTERED_SPRINT_FINAL:
-                    if driver[0] == pilot:
-                        tot = tot + driver[5]
-                        continue
-                for driver in FILTERED_RACE_FINAL:
-                    if driver[0] == pilot:
-                        tot = tot + driver[5]
-                        continue
+    # prima i punti: se la pubblicazione fallisce le statistiche non vengono toccate
+    try:
+        team_totals = publish_race_points(cat, league, tag, team_totals, inputs["previous_points"])
+    except Exception as e:
+        st.error(f"Error publishing points for {tag}: {e}")
+        return False
 
-            response = (
-                supabase
-                .table(table)
-                .update({
-                    tag: float(tot)
-                })
-                .eq("league", league)
-                .eq("id", team["UUID"])
-                 .execute()
-            ) 
-
-            if cat == "F1":
-                category = "F126"
-            elif cat == "MGP":
-                category = "MGP26"
-            else:
-                raise ValueError(f"cat non valida: {cat}")
-    
-            filename = f"sprint_standings_{league}.pkl"
-            storage_path = f"{tag}/{filename}"
+    write_league_stats(
+        cat,
+        league,
+        tag,
+        [racer[0] for racer in results["Grand Prix"]],
+        calls,
+        FILTERED_RACE_FINAL,
+    )
 
-            buffer = io.BytesIO()
-            pickle.dump(FILTERED_SPRINT_FINAL, buffer, protocol=pickle.HIGHEST_PROTOCOL)
-            file_bytes = buffer.getvalue()
+    # ricostruzione completa della league (idempotente anche con i trigger di sql/league_standings.sql)
+    try:
+        rebuild_league_standings(league)
+    except Exception as e:
+        st.warning(f"Standings not updated for {tag}: {e}")
 
-    
-            supabase.storage.from_(category).upload(
-                storage_path,
-                file_bytes,
-                file_options={
-                    "content-type": "application/octet-stream",
-                    "upsert": "true"
-                }
-            )
+    files = publish_standings_artifacts(bucket_name, tag, league, FILTERED_SPRINT_FINAL, FILTERED_RACE_FINAL)
 
-            filename = f"standings_{league}.pkl"
-            storage_path = f"{tag}/{filename}"
+    try:
+        update_manifest(supabase, bucket_name, tag, files)
+    except Exception as e:
+        st.warning(f"Storage manifest not updated for {tag}: {e}")
+    invalidate_manifest(bucket_name)
 
-            buffer = io.BytesIO()
-            pickle.dump(FILTERED_RACE_FINAL, buffer, protocol=pickle.HIGHEST_PROTOCOL)
-            file_bytes = buffer.getvalue()
+    invalidate_tables(
+        RACEWEEK_TABLES[cat]["points"],
+        "league_mgp_stats" if cat == "MGP" else "league_f1_stats",
+        STANDINGS_TABLE,
+    )
 
-    
-            supabase.storage.from_(category).upload(
-                storage_path,
-                file_bytes,
-                file_options={
-                    "content-type": "application/octet-stream",
-                    "upsert": "true"
-                }
-            )
-    
     return True   
 
 # --------------------- CHAMPIONSHIP SCREEN ----------------------------------------------------
@@ -1365,6 +1087,7 @@ def edit_rules_screen():
                         succeeded.append(ins.data or [])
             except Exception as exc:
                 failed.append((rid, str(exc)))
+        invalidate_tables(table_name)
 
         if failed:
             st.error(f"Some updates failed: {failed}")
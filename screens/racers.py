@@ -1,7 +1,7 @@
 import html as _html
 from supabase import create_client
 import streamlit as st
-from logic.functions import parse_list_field, normalize_fullname_for_keys, safe_rgb_to_hex
+from logic.functions import parse_list_field, canonical_key, safe_rgb_to_hex, cached_rows
 
 # -------------------------------------------------------------------------------------------
 # -------------------------------------------------------------------------------------------
@@ -36,10 +36,10 @@ def racers_screen(user):
     league_id = str(user.get("league")) if isinstance(user, dict) and user.get("league") is not None else None
 
 # fetch teams solo della lega dell'user
-    teams = supabase.from_("teams").select("*").eq("league", league_id).execute().data or []
+    teams = cached_rows("teams", (("league", league_id),))
 
-    racers_f1 = supabase.from_("racers_f1_new").select("*").execute().data or []
-    racers_mgp = supabase.from_("racers_mgp_new").select("*").execute().data or []
+    racers_f1 = cached_rows("racers_f1_new")
+    racers_mgp = cached_rows("racers_mgp_new")
 
     # league id dell'utente (per fetch delle stats)
     league_id = str(user.get("league")) if isinstance(user, dict) and user.get("league") is not None else None
@@ -55,8 +55,7 @@ def racers_screen(user):
             if kl in ("f1", "f1drivers", "drivers_f1", "drivers") or "motogp" in kl or kl in ("mgp", "moto", "moto_gp"):
                 members = parse_list_field(val)
                 for m in members:
-                    k = normalize_fullname_for_keys(m)
-                    pilot_to_fpk[k.lower()] = team_name
+                    pilot_to_fpk[canonical_key(m)] = team_name
 
     # --- unisci tutti i racers in un'unica lista e aggiungi _category
     all_racers = []
@@ -141,8 +140,7 @@ def racers_screen(user):
         # team real / FPK
         real_team = r.get("real_team") or r.get("real team") or ""
         value_int = int(round(parse_value(r.get("Value") or r.get("value") or 0)))
-        fpk_key = normalize_fullname_for_keys(rid_str)
-        fpk_team = pilot_to_fpk.get(fpk_key.lower(), "")
+        fpk_team = pilot_to_fpk.get(canonical_key(rid_str), "")
 
         # prendi stats dalla mappa corretta in base alla categoria
         stats_map = stats_f1_map if cat == "F1" else stats_mgp_map
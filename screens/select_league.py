@@ -5,8 +5,9 @@ import uuid
 from datetime import datetime
 import streamlit as st
 from supabase import create_client, Client
-from logic.functions import go_to_screen
+from logic.functions import go_to_screen, rebuild_league_standings, invalidate_tables
 from screens.home import home_screen
+from logic.scoring import RULES_TEMPLATE_LEAGUE
 
 # -------------------------------------------------------------------------------------------
 # --------------------- SUPABASE CLIENT -----------------------------------------------------
@@ -106,6 +107,7 @@ def build_team(user, league_id, team_name, main_color_rgb, second_color_rgb, tea
     if getattr(insert_resp, "error", None):
         st.error(f"Errore nella creazione della squadra: {insert_resp.error}")
         return None
+    invalidate_tables("teams")
 
     try:
         inserted_row = (insert_resp.data or [None])[0]
@@ -114,6 +116,12 @@ def build_team(user, league_id, team_name, main_color_rgb, second_color_rgb, tea
     if not inserted_row:
         inserted_row = new_team
 
+    # il nuovo team entra subito nei totali di league_standings
+    try:
+        rebuild_league_standings(league_id)
+    except Exception as e:
+        st.warning(f"Standings not updated: {e}")
+
     st.success(f"Team '{team_name}' created")
     st.session_state["user"] = inserted_row
     return inserted_row
@@ -391,6 +399,7 @@ def league_screen(user):
                                                     st.warning("Warning: non è stato possibile inserire tutte le righe iniziali in calls/penalty. Verifica i log.")
                                             except Exception as e:
                                                 st.warning(f"Warning: errore durante l'inserimento delle righe iniziali: {e}")
+                                            invalidate_tables("calls_f1_new", "calls_mgp_new", "penalty_new")
 
                                             # pulisco il form di join così non rimane visibile nelle sessioni successive
                                             for k in ("join_league_found","join_league_id","join_league_pw_input","join_team_name","join_team_location","join_main_color_hex","join_second_color_hex"):
@@ -437,6 +446,7 @@ def league_screen(user):
                                             st.warning("Warning: non è stato possibile inserire tutte le righe iniziali in calls/penalty. Verifica i log.")
                                     except Exception as e:
                                         st.warning(f"Warning: errore durante l'inserimento delle righe iniziali: {e}")
+                                    invalidate_tables("calls_f1_new", "calls_mgp_new", "penalty_new")
 
                                     # pulisco il form di join così non rimane visibile nelle sessioni successive
                                     for k in ("join_league_found","join_league_id","join_league_pw_input","join_team_name","join_team_location","join_main_color_hex","join_second_color_hex"):
@@ -629,9 +639,8 @@ def league_screen(user):
                                 st.info(f"Copied {len(inserted)} rows into {table_name} for league '{dest_league}'.")
 
 
-                        TEMPLATE_LEAGUE = "Fantamotori"
-                        copy_rules_from_template("rules_mgp_new", TEMPLATE_LEAGUE, league_id)
-                        copy_rules_from_template("rules_f1_new", TEMPLATE_LEAGUE, league_id)
+                        copy_rules_from_template("rules_mgp_new", RULES_TEMPLATE_LEAGUE, league_id)
+                        copy_rules_from_template("rules_f1_new", RULES_TEMPLATE_LEAGUE, league_id)
 
                         try:
                             roh_row = {
@@ -764,6 +773,13 @@ def league_screen(user):
                         # chiama la funzione per MotoGP
                         create_stats_for_series(league_id, "racers_mgp_new", "league_mgp_stats", player_col="id", player_field_in_stats="player_id")
 
+                        # righe nuove della league: niente copie vecchie nelle cache di processo
+                        invalidate_tables(
+                            "leagues", "rules_f1_new", "rules_mgp_new", "roll_of_honor_new", "penalty_new",
+                            "points_per_race_f1", "points_per_race_mgp", "calls_f1_new", "calls_mgp_new",
+                            "league_f1_stats", "league_mgp_stats",
+                        )
+
                         # Colori HEX → RGB
                         main_color_rgb = hex_to_rgb(st.session_state.get("main_color_hex", "#00CAFF"))
                         second_color_rgb = hex_to_rgb(st.session_state.get("second_color_hex", "#FFFFFF"))
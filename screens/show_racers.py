@@ -9,9 +9,10 @@ from logic.functions import (
     _parse_display_value,
     _count_items_like_list,
     _render_simple_table_html,
-    normalize_fullname_for_keys,
+    canonical_key,
     compute_stats_from_marks_record,
     avg_to_hex,  
+    cached_rows,
 )
 
 # -------------------------------------------------------------------------------------------
@@ -41,8 +42,8 @@ def show_racer_screen(user):
         return
 
     try:
-        data_f1 = supabase.from_("racers_f1_new").select("*").execute().data or []
-        data_mgp = supabase.from_("racers_mgp_new").select("*").execute().data or []
+        data_f1 = cached_rows("racers_f1_new")
+        data_mgp = cached_rows("racers_mgp_new")
     except Exception:
         data_f1, data_mgp = [], []
 
@@ -169,17 +170,17 @@ def show_racer_screen(user):
     SUFF_THRESHOLD = 6.0
 
     try:
-        marks_f1_rows = supabase.from_("marks_f1_new").select("*").execute().data or []
+        marks_f1_rows = cached_rows("marks_f1_new")
     except Exception:
         marks_f1_rows = []
 
     try:
-        marks_mgp_rows = supabase.from_("marks_mgp_new").select("*").execute().data or []
+        marks_mgp_rows = cached_rows("marks_mgp_new")
     except Exception:
         marks_mgp_rows = []
 
     def normalize_key(s):
-        return normalize_fullname_for_keys(str(s or "")).lower().strip()
+        return canonical_key(s)
 
     def index_marks_rows(rows):
         idx = {}
@@ -247,15 +248,14 @@ def show_racer_screen(user):
                                                           container_width_px=1000,
                                                           left_pct=0.65,
                                                           right_pct=0.35,
-                                                          avg_char_px=7.0,
-                                                          line_height_px=18,
-                                                          vertical_padding_px=8,
+                                                          vertical_padding_px=4,
                                                           min_h=80,
                                                           max_h=8000,
                                                           safety_mul=1.05,
-                                                          per_row_padding_px=0)
+                                                          per_row_padding_px=9,        # padding 4px sopra e sotto + bordo
+                                                          row_padding_x_px=10)
     with c_profile:
-        BUFFER_PX = 40
+        BUFFER_PX = 20   # margini del body dell'iframe + margin-bottom della tabella
         components.html(html_profile, height=profile_height + BUFFER_PX, scrolling=True)
 
     if avg_value is None:
@@ -361,13 +361,12 @@ def show_racer_screen(user):
                                                          container_width_px=1000,
                                                          left_pct=0.65,
                                                          right_pct=0.35,
-                                                         avg_char_px=7.0,
-                                                         line_height_px=18,
-                                                         vertical_padding_px=8,
+                                                         vertical_padding_px=4,
                                                          min_h=80,
                                                          max_h=8000,
                                                          safety_mul=1.05,
-                                                         per_row_padding_px=0)
+                                                         per_row_padding_px=9,        # padding 4px sopra e sotto + bordo
+                                                         row_padding_x_px=10)
     components.html(html_review, height=review_height + BUFFER_PX, scrolling=True)
 
     hist_rows = []
@@ -392,13 +391,12 @@ def show_racer_screen(user):
                                                      container_width_px=1000,
                                                      left_pct=0.65,
                                                      right_pct=0.35,
-                                                     avg_char_px=7.0,
-                                                     line_height_px=18,
-                                                     vertical_padding_px=8,
+                                                     vertical_padding_px=4,
                                                      min_h=80,
                                                      max_h=8000,
                                                      safety_mul=1.05,
-                                                     per_row_padding_px=0)
+                                                     per_row_padding_px=9,        # padding 4px sopra e sotto + bordo
+                                                     row_padding_x_px=10)
     components.html(html_hist, height=hist_height + BUFFER_PX, scrolling=True)
 
     st.markdown("<div style='margin-top:-10px;'></div>", unsafe_allow_html=True)
@@ -4,7 +4,7 @@ import json
 import html as _html
 from supabase import create_client
 import streamlit as st
-from logic.functions import safe_rgb_to_hex, hex_to_rgb, normalize_riders, update_user_field, _parse_display_value, color_to_rgb
+from logic.functions import safe_rgb_to_hex, hex_to_rgb, normalize_riders, update_user_field, _parse_display_value, color_to_rgb, cached_rows, invalidate_tables
 from screens.show_racers import show_racer_screen
 
 # -------------------------------------------------------------------------------------------
@@ -169,8 +169,8 @@ def your_team_screen(user):
     st.session_state.setdefault("customizing", False)
 
     # dati racer (restano per eventuali usi)
-    f1_data = supabase.from_("racers_f1_new").select("*").execute().data or []
-    mgp_data = supabase.from_("racers_mgp_new").select("*").execute().data or []
+    f1_data = cached_rows("racers_f1_new")
+    mgp_data = cached_rows("racers_mgp_new")
 
     st.subheader("Options")
 
@@ -302,10 +302,12 @@ def your_team_screen(user):
         new_main = st.color_picker("Principal color", value=safe_rgb_to_hex(user.get("main color", [255,255,255])))
         if st.button("Save principal color", use_container_width=True):
             supabase.table("teams").update({"main color": color_to_rgb(new_main)}).eq("who", user["who"]).eq("league", user["league"]).execute()
+            invalidate_tables("teams")
             st.success("Principal color updated!")
         new_second = st.color_picker("Second color", value=safe_rgb_to_hex(user.get("second color", [0,0,0])))
         if st.button("Save second color", use_container_width=True):
             supabase.table("teams").update({"second color": color_to_rgb(new_second)}).eq("who", user["who"]).eq("league", user["league"]).execute()
+            invalidate_tables("teams")
             st.success("Secondary color updated!")
         st.markdown("</div>", unsafe_allow_html=True)
 
@@ -0,0 +1,110 @@
+-- -------------------------------------------------------------------------------------------
+-- league_standings: totali grezzi (senza penalità) di ogni team per serie
+-- -------------------------------------------------------------------------------------------
+-- Una riga per (league, id) con la somma di tutti i tag di points_per_race_f1 /
+-- points_per_race_mgp. I trigger la tengono allineata a qualsiasi scrittura su
+-- points_per_race_* (app, script offline, modifiche a mano dalla dashboard);
+-- raceweek_computer e build_team la ricostruiscono comunque dopo le proprie
+-- scritture con la funzione rebuild_league_standings (via rpc), e la schermata
+-- standings torna a sommare points_per_race_* se la tabella manca o è vuota.
+-- Con la chiave anon la tabella è in sola lettura: scrivono solo i trigger e
+-- rebuild_league_standings, security definer, che ricalcolano i totali da
+-- points_per_race_* e non accettano valori dal client.
+-- Da eseguire una volta nell'SQL editor di Supabase; è rieseguibile.
+
+create table if not exists public.league_standings (
+    league text not null,
+    id text not null,
+    f1 float8 not null default 0,
+    mgp float8 not null default 0,
+    primary key (league, id)
+);
+
+-- stesse colonne escluse di logic/standings.py (EXCLUDED_POINTS_KEYS)
+create or replace function public.points_row_total(r jsonb)
+returns float8
+language sql
+immutable
+as $$
+    select coalesce(sum((value #>> '{}')::float8), 0)
+    from jsonb_each(r)
+    where key not in ('id', 'prim_key', 'league')
+      and jsonb_typeof(value) = 'number'
+$$;
+
+create or replace function public.sync_league_standings()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    col text := case when tg_table_name = 'points_per_race_f1' then 'f1' else 'mgp' end;
+begin
+    if tg_op = 'DELETE' then
+        execute format('update league_standings set %I = 0 where league = $1 and id = $2', col)
+            using old.league, old.id;
+        return old;
+    end if;
+    if new.league is null or new.id is null then
+        return new;
+    end if;
+    execute format(
+        'insert into league_standings (league, id, %1$I) values ($1, $2, $3) '
+        'on conflict (league, id) do update set %1$I = excluded.%1$I', col)
+        using new.league, new.id, points_row_total(to_jsonb(new));
+    return new;
+end;
+$$;
+
+drop trigger if exists league_standings_f1 on public.points_per_race_f1;
+create trigger league_standings_f1
+    after insert or update or delete on public.points_per_race_f1
+    for each row execute function public.sync_league_standings();
+
+drop trigger if exists league_standings_mgp on public.points_per_race_mgp;
+create trigger league_standings_mgp
+    after insert or update or delete on public.points_per_race_mgp
+    for each row execute function public.sync_league_standings();
+
+-- ricostruzione di una league da points_per_race_* (rpc dall'app, riempimento iniziale)
+create or replace function public.rebuild_league_standings(p_league text)
+returns setof public.league_standings
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+    delete from league_standings where league = p_league;
+    insert into league_standings (league, id, f1, mgp)
+    select p_league, id, sum(f1), sum(mgp)
+    from (
+        select id, points_row_total(to_jsonb(p)) as f1, 0::float8 as mgp
+        from points_per_race_f1 p
+        where league = p_league and id is not null
+        union all
+        select id, 0::float8, points_row_total(to_jsonb(p))
+        from points_per_race_mgp p
+        where league = p_league and id is not null
+    ) totals
+    group by id;
+    return query select * from league_standings where league = p_league;
+end;
+$$;
+
+revoke all on function public.rebuild_league_standings(text) from public;
+grant execute on function public.rebuild_league_standings(text) to anon, authenticated;
+
+-- l'app usa la chiave anon: solo lettura, nessuna policy di scrittura
+alter table public.league_standings enable row level security;
+drop policy if exists league_standings_read on public.league_standings;
+create policy league_standings_read on public.league_standings for select using (true);
+drop policy if exists league_standings_write on public.league_standings;
+
+-- riempimento iniziale da points_per_race_*
+select public.rebuild_league_standings(league)
+from (
+    select league from public.points_per_race_f1 where league is not null
+    union
+    select league from public.points_per_race_mgp where league is not null
+) leagues;
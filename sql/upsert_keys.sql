@@ -0,0 +1,33 @@
+-- -------------------------------------------------------------------------------------------
+-- Vincoli unici per gli upsert di raceweek_computer
+-- -------------------------------------------------------------------------------------------
+-- publish_race_points scrive points_per_race_f1 / points_per_race_mgp con un solo
+-- upsert on_conflict="league,id", write_league_stats scrive league_f1_stats /
+-- league_mgp_stats con un upsert on_conflict="player_id,league_id": PostgREST
+-- richiede un vincolo unico su quelle colonne, altrimenti risponde 42P10 e il
+-- calcolo della raceweek non viene pubblicato.
+-- Da eseguire una volta nell'SQL editor di Supabase; è rieseguibile.
+-- Se l'alter table fallisce ci sono righe doppie, da sistemare prima:
+--   select league, id, count(*) from points_per_race_f1 group by 1, 2 having count(*) > 1;
+--   select player_id, league_id, count(*) from league_f1_stats group by 1, 2 having count(*) > 1;
+
+do $$
+begin
+    if not exists (select 1 from pg_constraint where conname = 'points_per_race_f1_league_id_key') then
+        alter table public.points_per_race_f1
+            add constraint points_per_race_f1_league_id_key unique (league, id);
+    end if;
+    if not exists (select 1 from pg_constraint where conname = 'points_per_race_mgp_league_id_key') then
+        alter table public.points_per_race_mgp
+            add constraint points_per_race_mgp_league_id_key unique (league, id);
+    end if;
+    if not exists (select 1 from pg_constraint where conname = 'league_f1_stats_player_id_league_id_key') then
+        alter table public.league_f1_stats
+            add constraint league_f1_stats_player_id_league_id_key unique (player_id, league_id);
+    end if;
+    if not exists (select 1 from pg_constraint where conname = 'league_mgp_stats_player_id_league_id_key') then
+        alter table public.league_mgp_stats
+            add constraint league_mgp_stats_player_id_league_id_key unique (player_id, league_id);
+    end if;
+end;
+$$;